@@ -1,11 +1,17 @@
 import os
 import json
-import re
-import requests
+import math
+import atexit
 import hashlib
 import uuid
+import random
+import time
+from collections import Counter
+from functools import wraps
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import timedelta, datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import (
     JWTManager, create_access_token, 
@@ -13,16 +19,54 @@ from flask_jwt_extended import (
 )
 from google import genai
 from dotenv import load_dotenv
+from user_store import (
+    create_user_store, write_json_atomic, ProfileCache, UserStats, UserQuery, encode_cursor
+)
+from passwords import PasswordHasher
+from metrics import Metrics
+from http_cache import CachedBody, RenderCache
+from rate_limit import LimitExceeded, RateLimiter, ConcurrencyLimiter, create_rate_limit_backend
+from catalog import ProductCatalog, ProductFeatures
+from facets import FacetIndex
+from lexicon import LEXICON, STOP_WORDS, RATING_WORDS
+from query_parser import parse_message, strip_bound_words
+from intent_cache import IntentCache
+from upstream import UpstreamClient, CircuitBreaker
+from search_index import SearchIndex, tokenize
+from ranking import rank_products
+from vector_ranking import ColumnarCatalog, np
 
 load_dotenv()
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Total-Count', 'X-Catalog-Version', 'X-Catalog-Epoch'])
 
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET', 'ecommerce-demo-secret-key-2024-change-in-production')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 jwt = JWTManager(app)
 
+metrics = Metrics()
+metrics.describe('http_request_duration_seconds', 'Request latency by route')
+metrics.describe('http_requests_total', 'Requests by route and status')
+metrics.describe('chat_stage_seconds', 'Time spent in each /chat pipeline stage')
+metrics.describe('upstream_failures_total', 'Failed calls to the product API')
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if started is not None:
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started,
+                        route=route, method=request.method)
+    metrics.inc('http_requests_total', route=route, method=request.method, status=response.status_code)
+    return response
+
 USERS_FILE = 'users.json'
+USERS_DB = os.environ.get('USERS_DB', 'users.db')
+USER_STORE_BACKEND = os.environ.get('USER_STORE', 'json')
 
 def load_users():
     try:
@@ -70,36 +114,183 @@ def load_users():
 
 def save_users(users):
     try:
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users, f, indent=2)
+        write_json_atomic(USERS_FILE, users)
         return True
     except Exception as e:
         print(f"Error saving users: {e}")
         return False
 
+password_hasher = PasswordHasher(
+    scheme=os.environ.get('PASSWORD_SCHEME', 'scrypt'),
+    scrypt_n=int(os.environ.get('SCRYPT_N', str(2 ** 14))),
+    pbkdf2_iterations=int(os.environ.get('PBKDF2_ITERATIONS', '600000')),
+    workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '4'))
+)
+
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    return password_hasher.hash(password)
+
+users_repo = create_user_store(
+    USER_STORE_BACKEND, USERS_FILE, USERS_DB, load_users,
+    flush_interval=float(os.environ.get('USERS_FLUSH_INTERVAL', '2.0')),
+    batch_size=int(os.environ.get('USERS_FLUSH_BATCH', '100'))
+)
+users_repo.load()
+atexit.register(users_repo.flush)
+
+profile_cache = ProfileCache(ttl=float(os.environ.get('PROFILE_CACHE_TTL', '30')))
+user_stats = UserStats()
+ADMIN_USERS_PAGE_SIZE = int(os.environ.get('ADMIN_USERS_PAGE_SIZE', '100'))
+ADMIN_USERS_MAX_PAGE_SIZE = 1000
+user_stats.rebuild(users_repo.all(), users_repo.generation)
+
+def current_user_stats():
+    # The users file was reloaded from disk, so incremental counters may be stale.
+    if user_stats.generation != users_repo.generation:
+        user_stats.rebuild(users_repo.all(), users_repo.generation)
+    return user_stats.snapshot()
 
 def find_user_by_email(email):
-    users = load_users()
-    return next((user for user in users if user['email'] == email), None)
+    return users_repo.find_by_email(email)
 
 def update_user_last_login(user_id):
-    users = load_users()
-    for user in users:
-        if user['id'] == user_id:
-            user['last_login'] = datetime.utcnow().isoformat()
-            save_users(users)
-            break
+    now = datetime.utcnow()
+    users_repo.update(user_id, last_login=now.isoformat())
+    profile_cache.invalidate(user_id)
+    user_stats.record_login(user_id, now)
 
 try:
     client = genai.Client()
 except Exception as e:
     client = None
 
-FAKESTORE_API = "https://fakestoreapi.com"
+intent_cache = IntentCache(
+    max_size=int(os.environ.get('INTENT_CACHE_SIZE', '1000')),
+    ttl=float(os.environ.get('INTENT_CACHE_TTL', '3600')),
+    persist_path=os.environ.get('INTENT_CACHE_FILE')
+)
+intent_cache.load()
+atexit.register(intent_cache.save)
+
+# 'llm_first' asks Gemini and patches gaps with the local parser;
+# 'local_first' only asks Gemini when the local parser is unsure.
+INTENT_MODE = os.environ.get('INTENT_MODE', 'llm_first')
+# Above the 0.6 a single category earns on its own, so at least half of
+# the query's content words must be explained by the lexicon as well.
+INTENT_CONFIDENCE_THRESHOLD = float(os.environ.get('INTENT_CONFIDENCE_THRESHOLD', '0.8'))
+intent_stats = Counter()
+
+# 'concurrent' overlaps intent extraction with the catalog fetch and
+# enforces per-stage deadlines; 'sequential' runs them one after another.
+CHAT_PIPELINE_MODE = os.environ.get('CHAT_PIPELINE', 'concurrent')
+CHAT_INTENT_DEADLINE = float(os.environ.get('CHAT_INTENT_DEADLINE', '3.0'))
+CHAT_CATALOG_DEADLINE = float(os.environ.get('CHAT_CATALOG_DEADLINE', '8.0'))
+pipeline_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('CHAT_PIPELINE_WORKERS', '16')),
+    thread_name_prefix='chat-pipeline'
+)
+
+CHAT_BATCH_MAX = int(os.environ.get('CHAT_BATCH_MAX', '50'))
+batch_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('CHAT_BATCH_WORKERS', '4')),
+    thread_name_prefix='chat-batch'
+)
+
+rate_limit_backend = create_rate_limit_backend(os.environ.get('RATE_LIMIT_BACKEND', 'memory'))
+chat_limiter = RateLimiter(
+    rate_limit_backend,
+    per_minute=float(os.environ.get('CHAT_RATE_PER_MINUTE', '30')),
+    burst=int(os.environ.get('CHAT_RATE_BURST', '10'))
+)
+auth_limiter = RateLimiter(
+    rate_limit_backend,
+    per_minute=float(os.environ.get('AUTH_RATE_PER_MINUTE', '10')),
+    burst=int(os.environ.get('AUTH_RATE_BURST', '5'))
+)
+llm_limiter = ConcurrencyLimiter(int(os.environ.get('LLM_MAX_CONCURRENCY', '4')))
+
+def rate_limit_identity():
+    try:
+        user_id = get_jwt_identity()
+    except Exception:
+        user_id = None
+    return f"user:{user_id}" if user_id else f"ip:{request.remote_addr}"
+
+def rate_limited_response(scope, retry_after):
+    metrics.inc('rate_limited_total', scope=scope)
+    response = jsonify({'success': False,'error': 'Too many requests, please slow down'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def rate_limited(limiter, scope):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                limiter.check(f"{scope}:{rate_limit_identity()}")
+            except LimitExceeded as e:
+                return rate_limited_response(scope, e.retry_after)
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+FAKESTORE_API = os.environ.get('FAKESTORE_API', "https://fakestoreapi.com")
+
+upstream = UpstreamClient(
+    FAKESTORE_API,
+    timeout=(float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', '3.05')),
+             float(os.environ.get('UPSTREAM_READ_TIMEOUT', '10'))),
+    retries=int(os.environ.get('UPSTREAM_RETRIES', '2')),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.environ.get('UPSTREAM_BREAKER_THRESHOLD', '5')),
+        reset_timeout=float(os.environ.get('UPSTREAM_BREAKER_RESET', '30'))
+    )
+)
+
+def fetch_fakestore_catalog():
+    try:
+        with metrics.timer('chat_stage_seconds', stage='catalog_fetch'):
+            return upstream.get_json('/products')
+    except Exception as e:
+        metrics.inc('upstream_failures_total', reason=type(e).__name__)
+        raise
+
+def annotate_product(product):
+    title = product['title'].lower()
+    description = product.get('description', '').lower()
+    text = f"{title} {description}"
+    return ProductFeatures(
+        title=title,
+        description=description,
+        tokens=frozenset(tokenize(text)),
+        colors=frozenset(detect_colors_in_text(text))
+    )
+
+catalog = ProductCatalog(
+    fetch_fakestore_catalog,
+    ttl=float(os.environ.get('CATALOG_TTL', '300')),
+    offline=os.environ.get('CATALOG_OFFLINE', '').lower() in ('1', 'true', 'yes'),
+    enrich_fn=annotate_product
+)
+product_index = SearchIndex()
+catalog.add_listener(product_index.build)
+catalog.add_change_listener(product_index.apply)
+
+# Vectorized chat scoring for large catalogs; needs the optional numpy.
+VECTOR_SCORING_MIN = int(os.environ.get('VECTOR_SCORING_MIN', '1000'))
+columnar_catalog = None
+if np is not None:
+    columnar_catalog = ColumnarCatalog(lambda product: catalog.features(product['id']) or annotate_product(product))
+    catalog.add_listener(columnar_catalog.build)
+    catalog.add_change_listener(columnar_catalog.apply)
+
+facet_index = FacetIndex(lambda product: catalog.features(product['id']) or annotate_product(product))
+catalog.add_listener(facet_index.build)
+catalog.add_change_listener(facet_index.apply)
 
 @app.route('/api/auth/register', methods=['POST'])
+@rate_limited(auth_limiter, 'auth')
 def register():
     try:
         data = request.json
@@ -130,9 +321,11 @@ def register():
             'last_login': datetime.utcnow().isoformat()
         }
         
-        users = load_users()
-        users.append(new_user)
-        save_users(users)
+        if not users_repo.add(new_user):
+            return jsonify({'success': False,'error': 'Email already registered'}), 400
+        profile_cache.invalidate(new_user['id'])
+        user_stats.record_signup(new_user)
+        user_stats.record_login(new_user['id'])
         
         access_token = create_access_token(
             identity=new_user['id'],
@@ -162,6 +355,7 @@ def register():
         return jsonify({'success': False,'error': 'Registration failed'}), 500
 
 @app.route('/api/auth/login', methods=['POST'])
+@rate_limited(auth_limiter, 'auth')
 def login():
     try:
         data = request.json
@@ -171,12 +365,16 @@ def login():
         
         user = find_user_by_email(data['email'])
         if not user:
+            password_hasher.verify_missing(data['password'])
             return jsonify({'success': False,'error': 'Invalid email or password'}), 401
         
-        hashed_input = hash_password(data['password'])
-        if user['password'] != hashed_input:
+        if not password_hasher.verify(data['password'], user['password']):
             return jsonify({'success': False,'error': 'Invalid email or password'}), 401
         
+        # Legacy SHA-256 or outdated cost settings get upgraded on the fly.
+        if password_hasher.needs_rehash(user['password']):
+            users_repo.update(user['id'], password=hash_password(data['password']))
+        
         update_user_last_login(user['id'])
         
         access_token = create_access_token(
@@ -211,23 +409,34 @@ def login():
 @jwt_required()
 def get_current_user():
     try:
-        claims = get_jwt()
         user_id = get_jwt_identity()
         
-        user = find_user_by_email(claims.get('email'))
-        if not user:
-            return jsonify({'success': False,'error': 'User not found'}), 404
-        
-        user_response = {
-            'id': user['id'],
-            'name': user['name'],
-            'email': user['email'],
-            'role': user['role'],
-            'created_at': user['created_at'],
-            'last_login': user['last_login']
-        }
+        cached = profile_cache.get(user_id)
+        if cached is None:
+            user = users_repo.find_by_id(user_id)
+            if not user:
+                return jsonify({'success': False,'error': 'User not found'}), 404
+            
+            user_response = {
+                'id': user['id'],
+                'name': user['name'],
+                'email': user['email'],
+                'role': user['role'],
+                'created_at': user['created_at'],
+                'last_login': user['last_login']
+            }
+            body = json.dumps({'success': True,'user': user_response}, separators=(',', ':'))
+            etag = hashlib.sha256(body.encode()).hexdigest()[:32]
+            cached = profile_cache.put(user_id, (body, etag))
         
-        return jsonify({'success': True,'user': user_response})
+        body, etag = cached
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
         return jsonify({'success': False,'error': 'Failed to get user'}), 500
@@ -261,16 +470,38 @@ def get_all_users():
         if claims.get('role') != 'admin':
             return jsonify({'success': False,'error': 'Admin access required'}), 403
         
-        users = load_users()
-        safe_users = []
-        for user in users:
-            safe_user = {k: v for k, v in user.items() if k != 'password'}
-            safe_users.append(safe_user)
+        try:
+            query = UserQuery(
+                role=request.args.get('role'),
+                email_prefix=request.args.get('email_prefix'),
+                created_after=request.args.get('created_after'),
+                created_before=request.args.get('created_before'),
+                sort=request.args.get('sort', 'created_at'),
+                descending=request.args.get('order', 'asc') == 'desc',
+                after=request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({'success': False,'error': str(e)}), 400
+        
+        def safe_user(user):
+            return {k: v for k, v in user.items() if k != 'password'}
+        
+        if request.args.get('format') == 'ndjson':
+            def generate():
+                for user in users_repo.iter_users(query):
+                    yield json.dumps(safe_user(user)) + "\n"
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        limit = min(max(request.args.get('limit', ADMIN_USERS_PAGE_SIZE, type=int), 1), ADMIN_USERS_MAX_PAGE_SIZE)
+        page = list(islice(users_repo.iter_users(query), limit + 1))
+        next_cursor = encode_cursor(page[limit - 1], query.sort) if len(page) > limit else None
+        safe_users = [safe_user(user) for user in page[:limit]]
         
         return jsonify({
             'success': True,
             'users': safe_users,
-            'count': len(safe_users)
+            'count': len(safe_users),
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
@@ -285,29 +516,12 @@ def get_admin_stats():
         if claims.get('role') != 'admin':
             return jsonify({'success': False,'error': 'Admin access required'}), 403
         
-        users = load_users()
-        total_users = len(users)
-        admin_users = len([u for u in users if u['role'] == 'admin'])
-        regular_users = total_users - admin_users
-        recent_users = 0
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        
-        for user in users:
-            if user.get('created_at'):
-                created = datetime.fromisoformat(user['created_at'].replace('Z', '+00:00'))
-                if created > week_ago:
-                    recent_users += 1
+        stats = current_user_stats()
+        stats['total_orders'] = 0
         
         return jsonify({
             'success': True,
-            'stats': {
-                'total_users': total_users,
-                'admin_users': admin_users,
-                'regular_users': regular_users,
-                'recent_users': recent_users,
-                'active_today': 0,
-                'total_orders': 0
-            }
+            'stats': stats
         })
         
     except Exception as e:
@@ -322,8 +536,7 @@ def get_admin_products():
         if claims.get('role') != 'admin':
             return jsonify({'success': False,'error': 'Admin access required'}), 403
         
-        response = requests.get(f"{FAKESTORE_API}/products")
-        products = response.json()
+        products = catalog.products()
         
         return jsonify({
             'success': True,
@@ -334,61 +547,297 @@ def get_admin_products():
     except Exception as e:
         return jsonify({'success': False,'error': 'Failed to fetch products'}), 500
 
+def validate_product_payload(data, partial=False):
+    product = {}
+    for field in ('title', 'description', 'category', 'image'):
+        if field in data:
+            if not isinstance(data[field], str):
+                raise ValueError(f"{field} must be a string")
+            product[field] = data[field].strip()
+    if 'price' in data:
+        try:
+            price = float(data['price'])
+        except (TypeError, ValueError):
+            raise ValueError('price must be a number')
+        # NaN and Infinity would be written out as invalid JSON.
+        if not math.isfinite(price):
+            raise ValueError('price must be a finite number')
+        if price < 0:
+            raise ValueError('price must not be negative')
+        product['price'] = round(price, 2)
+    if 'rating' in data:
+        rating = data['rating'] or {}
+        try:
+            product['rating'] = {'rate': float(rating.get('rate', 0)), 'count': int(rating.get('count', 0))}
+        except (AttributeError, TypeError, ValueError, OverflowError):
+            raise ValueError('rating must look like {"rate": 4.5, "count": 10}')
+        if not 0 <= product['rating']['rate'] <= 5:
+            raise ValueError('rating.rate must be between 0 and 5')
+        if product['rating']['count'] < 0:
+            raise ValueError('rating.count must not be negative')
+    if not partial:
+        missing = [f for f in ('title', 'price', 'category') if not product.get(f) and product.get(f) != 0]
+        if missing:
+            raise ValueError(f"Missing fields: {', '.join(missing)}")
+        product.setdefault('description', '')
+        product.setdefault('image', '')
+        product.setdefault('rating', {'rate': 0, 'count': 0})
+    return product
+
+@app.route('/api/admin/products', methods=['POST'])
+@jwt_required()
+def create_admin_product():
+    if get_jwt().get('role') != 'admin':
+        return jsonify({'success': False,'error': 'Admin access required'}), 403
+    try:
+        try:
+            fields = validate_product_payload(request.get_json(silent=True) or {})
+        except ValueError as e:
+            return jsonify({'success': False,'error': str(e)}), 400
+        
+        product, version = catalog.create(fields)
+        return jsonify({'success': True,'product': product,'version': version}), 201
+    
+    except Exception as e:
+        return jsonify({'success': False,'error': 'Failed to create product'}), 500
+
+@app.route('/api/admin/products/<int:product_id>', methods=['PUT', 'PATCH'])
+@jwt_required()
+def update_admin_product(product_id):
+    if get_jwt().get('role') != 'admin':
+        return jsonify({'success': False,'error': 'Admin access required'}), 403
+    try:
+        existing = catalog.get(product_id)
+        if existing is None:
+            return jsonify({'success': False,'error': 'Product not found'}), 404
+        try:
+            fields = validate_product_payload(request.get_json(silent=True) or {}, partial=True)
+        except ValueError as e:
+            return jsonify({'success': False,'error': str(e)}), 400
+        
+        product, version = catalog.upsert(dict(existing, **fields))
+        return jsonify({'success': True,'product': product,'version': version})
+    
+    except Exception as e:
+        return jsonify({'success': False,'error': 'Failed to update product'}), 500
+
+@app.route('/api/admin/products/<int:product_id>', methods=['DELETE'])
+@jwt_required()
+def delete_admin_product(product_id):
+    if get_jwt().get('role') != 'admin':
+        return jsonify({'success': False,'error': 'Admin access required'}), 403
+    try:
+        version = catalog.delete(product_id)
+        if version is None:
+            return jsonify({'success': False,'error': 'Product not found'}), 404
+        return jsonify({'success': True,'id': product_id,'version': version})
+    
+    except Exception as e:
+        return jsonify({'success': False,'error': 'Failed to delete product'}), 500
+
+PRODUCT_FIELDS = ('id', 'title', 'price', 'description', 'category', 'image', 'rating')
+PRODUCTS_MAX_LIMIT = int(os.environ.get('PRODUCTS_MAX_LIMIT', 500))
+product_responses = RenderCache(max_size=int(os.environ.get('PRODUCT_RESPONSE_CACHE_SIZE', 256)))
+
+def parse_product_fields(raw):
+    if not raw:
+        return None
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in PRODUCT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def project_product(product, fields):
+    if fields is None:
+        return product
+    return {field: product[field] for field in fields if field in product}
+
+def render_json(data, headers=None):
+    return CachedBody(json.dumps(data, separators=(',', ':')), headers=headers)
+
+@app.route('/api/products', methods=['GET'])
+def list_products():
+    try:
+        fields = parse_product_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'success': False,'error': str(e)}), 400
+    category = request.args.get('category')
+    limit = request.args.get('limit', type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    if limit is not None:
+        limit = min(max(limit, 1), PRODUCTS_MAX_LIMIT)
+
+    def render():
+        products = catalog.by_category(category) if category else catalog.products()
+        offset = (page - 1) * limit if limit else 0
+        selected = products[offset:offset + limit] if limit else products
+        return render_json([project_product(p, fields) for p in selected],
+                           headers={'X-Total-Count': str(len(products)), 'X-Catalog-Version': str(version),
+                                    'X-Catalog-Epoch': catalog.epoch})
+
+    catalog.products()
+    version = catalog.version
+    body = product_responses.get_or_render(
+        version, ('list', category, fields, page, limit), render)
+    return body.to_response(request)
+
+@app.route('/api/products/changes', methods=['GET'])
+def product_changes():
+    since = request.args.get('since', 0, type=int)
+    version, changed, removed, reset = catalog.changes_since(since, request.args.get('epoch'))
+    response = jsonify({
+        'version': version,
+        'epoch': catalog.epoch,
+        'reset': reset,
+        'products': changed,
+        'removed': removed
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/api/products/<int:product_id>', methods=['GET'])
+def get_product(product_id):
+    try:
+        fields = parse_product_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'success': False,'error': str(e)}), 400
+    product = catalog.get(product_id)
+    if product is None:
+        return jsonify({'success': False,'error': 'Product not found'}), 404
+    body = product_responses.get_or_render(
+        catalog.version, ('item', product_id, fields),
+        lambda: render_json(project_product(product, fields)))
+    return body.to_response(request)
+
+@app.route('/api/products/categories', methods=['GET'])
+def list_product_categories():
+    categories = catalog.categories()
+    body = product_responses.get_or_render(
+        catalog.version, ('categories',), lambda: render_json(categories))
+    return body.to_response(request)
+
 @app.route('/api/search',methods=['GET'])
 def search_products():
-    search_query=request.args.get('q','').lower()
-    response=requests.get('https://fakestoreapi.com/products')
-    products= response.json()
-   
-    filtered=[]
-    for prod in products:
-        if search_query in prod['title'].lower():
-            filtered.append(prod) 
-    return jsonify(filtered)  # ✅ FIXED: Return outside the loop
-
-def detect_greeting_or_general(message):
-    message_lower = message.lower().strip()
-    
-    greetings = [
-        'hi', 'hello', 'hey', 'hii', 'hiii', 'hello there', 'hi there',
-        'good morning', 'good afternoon', 'good evening', 'gm', 'gn'
-    ]
-    
-    general_questions = [
-        'how are you', "what's up", 'how do you do', 'sup',
-        'are you there', 'can you hear me', 'who are you',
-        'what can you do', 'help', 'what is your name'
-    ]
-    
-    if any(message_lower == greet or message_lower.startswith(greet + ' ') for greet in greetings):
-        return 'greeting'
-    
-    if any(question in message_lower for question in general_questions):
-        return 'general'
-    
-    return None
-
-def extract_rating_from_query(query):
-    patterns = [
-        r'(\d+(?:\.\d+)?)\s*stars?',
-        r'(\d+(?:\.\d+)?)\s*ratings?',
-        r'rating\s*of\s*(\d+(?:\.\d+)?)',
-        r'rated\s*(\d+(?:\.\d+)?)',
-        r'(\d+(?:\.\d+)?)\s*star',
-        r'(\d+(?:\.\d+)?)/5'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, query.lower())
-        if match:
-            try:
-                rating = float(match.group(1))
-                return min(max(rating, 1), 5)  
-            except:
-                pass
-    return None
+    search_query = request.args.get('q', '')
+    limit = request.args.get('limit', type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    rank = request.args.get('sort', 'relevance') == 'relevance'
+    want_facets = request.args.get('facets', '').lower() in ('1', 'true', 'yes')
+    facet_filters = {
+        'category': request.args.get('category'),
+        'color': request.args.get('color'),
+        'price_min': request.args.get('min_price', type=float),
+        'price_max': request.args.get('max_price', type=float),
+        'rating_min': request.args.get('min_rating', type=float),
+        'rating_max': request.args.get('max_rating', type=float)
+    }
+    filtered_by_facets = any(value is not None for value in facet_filters.values())
+
+    catalog.products()
+    offset = (page - 1) * limit if limit else 0
+    if not (want_facets or filtered_by_facets):
+        filtered, total = product_index.search(search_query, limit=limit, offset=offset, rank=rank)
+        response = jsonify(filtered)
+        response.headers['X-Total-Count'] = str(total)
+        return response
+
+    if not tokenize(search_query):
+        # Nothing to match on text: the facet index answers on its own.
+        result = facet_index.query(**facet_filters)
+        matches, counts = result.products, result.counts
+    else:
+        allowed = None
+        if filtered_by_facets:
+            allowed = {p['id'] for p in facet_index.query(**facet_filters).products}
+        matches, _ = product_index.search(search_query, rank=rank, allowed=allowed)
+        counts = facet_index.counts_for(matches) if want_facets else None
+    end = offset + limit if limit else None
+    page_products = matches[offset:end]
+
+    if not want_facets:
+        response = jsonify(page_products)
+    else:
+        response = jsonify({
+            'products': page_products,
+            'total': len(matches),
+            'facets': counts
+        })
+    response.headers['X-Total-Count'] = str(len(matches))
+    return response
+
+@app.route('/api/search/suggest',methods=['GET'])
+def suggest_products():
+    catalog.products()
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    return jsonify(product_index.suggest(request.args.get('q', ''), limit))
 
-def extract_product_intent(user_query):
+def llm_extract_intent(llm_client, user_query):
+    prompt = f"""Analyze this shopping query: "{user_query}"      
+    Extract as JSON:
+    1. category (electronics, jewelery, men's clothing, women's clothing, or null)
+    2. color (if mentioned: red, blue, green, black, white, gold, silver, etc.)
+    3. keywords (main product keywords, as array)
+    
+    Return ONLY valid JSON.
+    Example: {{"category": "electronics", "color": "blue", "keywords": ["phone", "samsung"]}}
+    
+    If it's NOT a shopping query, return: {{"category": null, "color": null, "keywords": []}}
+    
+    JSON:"""
+    
+    # Raises LimitExceeded when every LLM slot is busy; callers fall back
+    # to the heuristic parser instead of queueing behind paid calls.
+    with llm_limiter, metrics.timer('chat_stage_seconds', stage='gemini'):
+        # Counted once a slot is held, so shed requests are not LLM calls.
+        intent_stats['llm'] += 1
+        response = llm_client.models.generate_content(
+            model="gemini-2.5-flash-lite",
+            contents=prompt
+        )
+    
+    return json.loads(response.text.strip().replace('```json', '').replace('```', ''))
+
+def parse_intent_locally(user_query):
+    hits = LEXICON.scan(user_query)
+    keywords = []
+    for word in user_query.lower().split():
+        word_clean = word.strip('.,!?')
+        if len(word_clean) > 2 and word_clean not in STOP_WORDS:
+            keywords.append(word_clean)
+    # "under $50" is a filter, not something to look for in product text.
+    if parse_message(user_query).has_bounds:
+        keywords = strip_bound_words(keywords)
+    
+    intent = {
+        "user_message": user_query,
+        "keywords": keywords,
+        "category": hits.category,
+        "color": hits.color
+    }
+    
+    # Confidence: one unambiguous category plus how much of the query the
+    # lexicon explained. Unknown words (brands, product types we have no
+    # term for) pull it down. A query naming several categories ("gold
+    # dress") is ambiguous and always goes to the LLM.
+    if len(hits.categories) > 1:
+        return intent, 0.0
+    confidence = 0.6 if hits.categories else 0.0
+    content_words = [k for k in keywords if k not in RATING_WORDS]
+    if content_words:
+        confidence += 0.4 * min(1.0, hits.terms / len(content_words))
+    
+    return intent, confidence
+
+def extract_product_intent(user_query, llm_client=None):
+    llm_client = llm_client or client
+    
+    if INTENT_MODE == 'local_first':
+        local_intent, confidence = parse_intent_locally(user_query)
+        if (confidence > 0 and confidence >= INTENT_CONFIDENCE_THRESHOLD) or not llm_client:
+            intent_stats['fast_path'] += 1
+            return local_intent
+    
     intent = {
         "user_message": user_query,
         "keywords": [],
@@ -396,124 +845,46 @@ def extract_product_intent(user_query):
         "color": None
     }
     
-    if client:
+    if llm_client:
+        called_llm = False
+
+        def call_llm(query):
+            nonlocal called_llm
+            called_llm = True
+            return llm_extract_intent(llm_client, query)
+
         try:
-            prompt = f"""Analyze this shopping query: "{user_query}"      
-            Extract as JSON:
-            1. category (electronics, jewelery, men's clothing, women's clothing, or null)
-            2. color (if mentioned: red, blue, green, black, white, gold, silver, etc.)
-            3. keywords (main product keywords, as array)
-            
-            Return ONLY valid JSON.
-            Example: {{"category": "electronics", "color": "blue", "keywords": ["phone", "samsung"]}}
-            
-            If it's NOT a shopping query, return: {{"category": null, "color": null, "keywords": []}}
-            
-            JSON:"""
-            
-            response = client.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=prompt
-            )
-            
-            gemini_intent = json.loads(response.text.strip().replace('```json', '').replace('```', ''))
+            gemini_intent = intent_cache.get_or_compute(user_query, call_llm)
+            if not called_llm:
+                intent_stats['cache_hit'] += 1
             intent.update(gemini_intent)
             
+        except LimitExceeded:
+            intent_stats['shed'] += 1
         except Exception as e:
-            pass
+            intent_stats['llm_errors'] += 1
+    else:
+        intent_stats['heuristic'] += 1
  
     if not intent.get('keywords') or intent.get('category') is None:
-        words = user_query.lower().split()
-        category_keywords = {
-            'electronics': ['electronics', 'phone', 'laptop', 'tablet', 'computer', 'tv', 'headphone', 'earphone', 'charger'],
-            'jewelery': ['jewelry', 'jewellery', 'ring', 'necklace', 'bracelet', 'gold', 'silver', 'diamond', 'gem'],
-            "men's clothing": ["men's", 'men', 'shirt', 't-shirt', 'pants', 'jeans', 'jacket', 'hoodie', 'sweater'],
-            "women's clothing": ["women's", 'women', 'dress', 'skirt', 'blouse', 'bra', 'handbag', 'purse', 'heels']
-        }
-        
-        colors = {
-            'red': ['red', 'rose', 'ruby', 'crimson', 'scarlet'],
-            'blue': ['blue', 'navy', 'azure', 'sky', 'cobalt'],
-            'green': ['green', 'emerald', 'forest', 'lime', 'olive'],
-            'black': ['black', 'dark', 'onyx', 'ebony', 'charcoal'],
-            'white': ['white', 'light', 'ivory', 'cream', 'pearl'],
-            'yellow': ['yellow', 'gold', 'golden', 'amber', 'lemon'],
-            'pink': ['pink', 'rose', 'fuchsia', 'magenta', 'coral'],
-            'purple': ['purple', 'violet', 'lavender', 'lilac', 'plum']
-        }
-
-        found_keywords = []
-        found_category = None
-        found_color = None
-        
-        for word in words:
-            word_clean = word.strip('.,!?')
-            
-            for color_name, color_words in colors.items():
-                if word_clean in color_words and not found_color:
-                    found_color = color_name
-                    break
-            
-            if not found_category:
-                for category, keywords in category_keywords.items():
-                    if word_clean in keywords:
-                        found_category = category
-                        break
-            
-            common_words = ['the', 'and', 'for', 'you', 'me', 'show', 'want', 'need', 
-                          'looking', 'with', 'have', 'has', 'this', 'that', 'these', 'those']
-            if len(word_clean) > 2 and word_clean not in common_words:
-                found_keywords.append(word_clean)
-        
-        if found_category:
-            intent['category'] = found_category
-        if found_color:
-            intent['color'] = found_color
-        if found_keywords:
-            intent['keywords'] = found_keywords
+        local_intent, _ = parse_intent_locally(user_query)
+        if local_intent['category']:
+            intent['category'] = local_intent['category']
+        if local_intent['color']:
+            intent['color'] = local_intent['color']
+        if local_intent['keywords']:
+            intent['keywords'] = local_intent['keywords']
     
     return intent
 
 def detect_colors_in_text(text):
-    colors = {
-        'red': ['red', 'rose', 'ruby', 'crimson', 'scarlet', 'burgundy', 'maroon', 'cherry'],
-        'blue': ['blue', 'navy', 'azure', 'sky', 'cobalt', 'indigo', 'teal', 'turquoise'],
-        'green': ['green', 'emerald', 'forest', 'lime', 'olive', 'mint', 'sage', 'jade'],
-        'black': ['black', 'dark', 'onyx', 'ebony', 'charcoal', 'midnight', 'jet'],
-        'white': ['white', 'light', 'ivory', 'cream', 'snow', 'pearl', 'alabaster'],
-        'yellow': ['yellow', 'gold', 'golden', 'amber', 'mustard', 'lemon', 'sunflower'],
-        'pink': ['pink', 'rose', 'fuchsia', 'magenta', 'coral', 'salmon', 'blush'],
-        'purple': ['purple', 'violet', 'lavender', 'lilac', 'plum', 'mauve', 'orchid']
-    }
-    
-    detected_colors = set()
-    text_lower = text.lower()
-    
-    for color_name, color_words in colors.items():
-        if any(f' {word} ' in f' {text_lower} ' for word in color_words):
-            detected_colors.add(color_name)
-    
-    return detected_colors
+    return LEXICON.colors_in(text)
 
 def check_color_match(title, description, requested_color):
-    colors_dict = {
-        'red': ['red', 'rose', 'ruby', 'crimson', 'scarlet', 'burgundy', 'maroon'],
-        'blue': ['blue', 'navy', 'azure', 'sky', 'cobalt', 'indigo'],
-        'green': ['green', 'emerald', 'forest', 'lime', 'olive', 'mint'],
-        'black': ['black', 'dark', 'onyx', 'ebony', 'charcoal'],
-        'white': ['white', 'light', 'ivory', 'cream', 'snow'],
-        'yellow': ['yellow', 'gold', 'golden', 'amber', 'mustard'],
-        'pink': ['pink', 'rose', 'fuchsia', 'magenta', 'coral'],
-        'purple': ['purple', 'violet', 'lavender', 'lilac', 'plum']
-    }
-    
-    if requested_color not in colors_dict:
-        return False
-    
-    text = f"{title} {description}".lower()
-    return any(word in text for word in colors_dict[requested_color])
+    return requested_color in LEXICON.colors_in(f"{title} {description}")
 
-def search_fakestore_products(intent, min_rating=None):
+def search_fakestore_products(intent, min_rating=None, price_min=None, price_max=None, rating_max=None):
+    """Return (ranked ScoredProduct results, response metadata)."""
     category_map = {
         "electronics": "electronics",
         "jewelery": "jewelery",
@@ -525,89 +896,42 @@ def search_fakestore_products(intent, min_rating=None):
     user_color = intent.get('color')
     keywords = intent.get('keywords', [])
     
-    rating_keywords = ['rating', 'ratings', 'star', 'stars', 'rated']
-    keywords = [k for k in keywords if k not in rating_keywords]
-    
-    api_url = f"{FAKESTORE_API}/products"
-    if user_category and user_category in category_map:
-        api_url = f"{FAKESTORE_API}/products/category/{category_map[user_category]}"
+    keywords = [k for k in keywords if k not in RATING_WORDS]
+    if any(bound is not None for bound in (min_rating, price_min, price_max, rating_max)):
+        keywords = strip_bound_words(keywords)
     
     try:
-        response = requests.get(api_url, timeout=10)
-        all_products = response.json()
-        available_colors_set = set()
-        
-        exact_color_matches = []  
-        other_products = []       
-        color_detected_in_any = False 
-        
-        for product in all_products:
-            product_title = product['title'].lower()
-            product_desc = product.get('description', '').lower()
-            product_rating = product.get('rating', {}).get('rate', 0)
-            
-            if min_rating and product_rating < min_rating:
-                continue
-            
-            product_colors = detect_colors_in_text(f"{product_title} {product_desc}")
-            available_colors_set.update(product_colors)
-            
-            has_exact_color_match = False
-            if user_color:
-                has_exact_color_match = check_color_match(product_title, product_desc, user_color)
-                color_detected_in_any = color_detected_in_any or has_exact_color_match
-            
-            match_score = 0
-            if keywords:
-                keyword_match = any(keyword.lower() in product_title or 
-                                   keyword.lower() in product_desc
-                                   for keyword in keywords if keyword and len(keyword) > 2)
-                if keyword_match:
-                    match_score += 3
-            
-            if has_exact_color_match:
-                match_score += 5  
-                product['color_detected'] = user_color
-                product['has_color_match'] = True
-            elif user_color:
-                match_score -= 2  
-            
-            if product_rating >= 4.5:
-                match_score += 1
-            
-            product['match_score'] = match_score
-            if has_exact_color_match:
-                exact_color_matches.append(product)
-            elif match_score > 0 or (not keywords and not user_color):
-                other_products.append(product)
-        
-        available_colors = sorted(list(available_colors_set))
-        
-        final_products = []
-        metadata = {
-            'exact_color_found': False,
-            'available_colors': available_colors,
-            'color_detected_in_any': color_detected_in_any
-        }
-        
-        if exact_color_matches:
-            exact_color_matches.sort(key=lambda x: x.get('match_score', 0), reverse=True)
-            final_products = exact_color_matches[:6]
-            metadata['exact_color_found'] = True
-        elif other_products and user_color:
-            other_products.sort(key=lambda x: x.get('match_score', 0), reverse=True)
-            final_products = other_products[:6]
-        elif other_products:
-            other_products.sort(key=lambda x: x.get('match_score', 0), reverse=True)
-            final_products = other_products[:6]
-        
-        for product in final_products:
-            product['metadata'] = metadata
+        catalog.products()
+        # Category, price and rating are hard filters; color stays a
+        # ranking preference so near misses can still be offered.
+        candidates = facet_index.query(
+            category=category_map.get(user_category),
+            price_min=price_min,
+            price_max=price_max,
+            rating_min=min_rating,
+            rating_max=rating_max
+        )
         
-        return final_products
+        if (columnar_catalog is not None and price_min is None and price_max is None and rating_max is None
+                and len(catalog.products()) >= VECTOR_SCORING_MIN):
+            results, metadata = columnar_catalog.rank(
+                keywords,
+                user_color=user_color,
+                min_rating=min_rating,
+                category=category_map.get(user_category)
+            )
+        else:
+            results, metadata = rank_products(
+                candidates.products,
+                lambda product: catalog.features(product['id']) or annotate_product(product),
+                keywords,
+                user_color=user_color
+            )
+        metadata['facets'] = candidates.counts
+        return results, metadata
         
     except Exception as e:
-        return []
+        return [], {}
 
 def generate_ai_response(user_message, products_found, user_color=None, min_rating=None, metadata=None):
     if not products_found:
@@ -618,12 +942,12 @@ def generate_ai_response(user_message, products_found, user_color=None, min_rati
         else:
             return "I couldn't find products matching your request. Try: 'electronics', 'clothing', or 'jewelry'."
     
-    meta = metadata or products_found[0].get('metadata', {}) if products_found else {}
+    meta = metadata or {}
     
     exact_color_found = meta.get('exact_color_found', False)
     available_colors = meta.get('available_colors', [])
     
-    exact_color_products = [p for p in products_found if p.get('has_color_match', False)]
+    exact_color_products = [p for p in products_found if p.color_match]
     
     if user_color and not exact_color_found:
         available_colors_str = ", ".join(available_colors) if available_colors else "various other colors"
@@ -644,8 +968,142 @@ def generate_ai_response(user_message, products_found, user_color=None, min_rati
     else:
         return f"✅ I found {len(products_found)} matching products for you!"
 
+def build_small_talk_response(user_message, message_type):
+    if message_type == 'greeting':
+        responses = [
+            f"👋 {user_message.capitalize()}! I'm your shopping assistant.",
+            f"Hello! 👋 I'm here to help you find products.",
+            f"Hi there! Ready to help you shop.",
+            f"{user_message.capitalize()}! Ask me for electronics, clothing, jewelry, or search for specific items!"
+        ]
+    else:
+        responses = [
+            "I'm doing great, thanks for asking! How can I help you find products today?",
+            "I'm here and ready to help! What are you looking for?",
+            "All systems go! What products can I help you find?",
+            "I'm your shopping assistant - ready to help you discover awesome products!"
+        ]
+    return {
+        'success': True,
+        'reply': random.choice(responses),
+        'products': [],
+        'query_type': message_type
+    }
+
+def resolve_intent_and_catalog(user_message):
+    """Run intent extraction and the catalog fetch side by side.
+
+    Returns (intent, catalog_ready). An LLM that misses its deadline is
+    replaced by the local parser; a catalog that misses its deadline
+    means no product search for this message.
+    """
+    if CHAT_PIPELINE_MODE != 'concurrent':
+        return extract_product_intent(user_message), True
+    
+    started = time.monotonic()
+    catalog_future = pipeline_pool.submit(catalog.products)
+    intent_future = pipeline_pool.submit(extract_product_intent, user_message)
+    
+    # Both deadlines count from submission, so time spent waiting on the
+    # intent is not added on top of the catalog's budget.
+    try:
+        intent = intent_future.result(timeout=CHAT_INTENT_DEADLINE)
+    except FutureTimeout:
+        intent_stats['llm_deadline_missed'] += 1
+        intent, _ = parse_intent_locally(user_message)
+    
+    try:
+        catalog_future.result(timeout=max(0, CHAT_CATALOG_DEADLINE - (time.monotonic() - started)))
+        catalog_ready = True
+    except FutureTimeout:
+        catalog_ready = False
+    except Exception as e:
+        print(f"Catalog fetch failed: {e}")
+        catalog_ready = False
+    
+    return intent, catalog_ready
+
+def format_chat_product(result):
+    product = result.product
+    rating = product.get('rating', {}).get('rate', 0)
+    return {
+        'id': product['id'],
+        'name': product['title'],
+        'price': f"${product['price']}",
+        'image': product['image'],
+        'url': f"/product/{product['id']}",
+        'category': product['category'],
+        'rating': f"{rating:.1f}/5",
+        'color': result.color if result.color else 'Various',
+        'match_score': result.score,
+        'description': product.get('description', '')[:60] + "...",
+        'exact_color_match': result.color_match
+    }
+
+def run_shopping_search(user_message, intent, catalog_ready=True, parsed=None):
+    parsed = parsed or parse_message(user_message)
+    min_rating = parsed.rating_min
+    
+    products, metadata = [], {}
+    if catalog_ready and (intent.get('category') or (intent.get('keywords') and len(intent['keywords']) > 0)):
+        with metrics.timer('chat_stage_seconds', stage='scoring'):
+            products, metadata = search_fakestore_products(
+                intent, min_rating, parsed.price_min, parsed.price_max, parsed.rating_max
+            )
+    if not products:
+        metadata = {}
+    
+    ai_response = generate_ai_response(
+        user_message, 
+        products, 
+        intent.get('color'), 
+        min_rating,
+        metadata
+    )
+    filters = {
+        'color_requested': intent.get('color'),
+        'min_rating': min_rating,
+        'max_rating': parsed.rating_max,
+        'min_price': parsed.price_min,
+        'max_price': parsed.price_max
+    }
+    return ai_response, products, filters, metadata
+
+def build_shopping_response(user_message, intent, catalog_ready=True, parsed=None):
+    ai_response, products, filters, metadata = run_shopping_search(user_message, intent, catalog_ready, parsed)
+    with metrics.timer('chat_stage_seconds', stage='formatting'):
+        formatted_products = [format_chat_product(product) for product in products]
+    return {
+        'success': True,
+        'reply': ai_response,
+        'products': formatted_products,
+        'query_type': 'shopping',
+        'filters': filters,
+        'metadata': metadata
+    }
+
+def stream_chat_events(user_message):
+    with metrics.timer('chat_stage_seconds', stage='classify'):
+        parsed = parse_message(user_message)
+    if parsed.is_small_talk:
+        response_data = build_small_talk_response(user_message, parsed.message_type)
+        yield {'type': 'reply', 'reply': response_data['reply'], 'query_type': parsed.message_type}
+        yield {'type': 'done', 'success': True, 'count': 0, 'filters': {}, 'metadata': {}}
+        return
+    
+    # Sent before any slow stage so the client gets its first byte at once.
+    yield {'type': 'start', 'query_type': 'shopping'}
+    
+    intent, catalog_ready = resolve_intent_and_catalog(user_message)
+    ai_response, products, filters, metadata = run_shopping_search(user_message, intent, catalog_ready, parsed)
+    yield {'type': 'reply', 'reply': ai_response, 'query_type': 'shopping'}
+    for product in products:
+        yield {'type': 'product', 'product': format_chat_product(product)}
+    yield {'type': 'done', 'success': True, 'count': len(products), 'filters': filters, 'metadata': metadata}
+
 @app.route('/chat', methods=['POST'])
 @jwt_required(optional=True)
+@rate_limited(chat_limiter, 'chat')
 def chat():
     try:
         user_info = "Guest"
@@ -659,105 +1117,205 @@ def chat():
         data = request.json
         user_message = data.get('message', '').strip()
         
-        message_type = detect_greeting_or_general(user_message)
-        if message_type == 'greeting':
-            import random
-            responses = [
-                f"👋 {user_message.capitalize()}! I'm your shopping assistant.",
-                f"Hello! 👋 I'm here to help you find products.",
-                f"Hi there! Ready to help you shop.",
-                f"{user_message.capitalize()}! Ask me for electronics, clothing, jewelry, or search for specific items!"
-            ]
-            return jsonify({
-                'success': True,
-                'reply': random.choice(responses),
-                'products': [],
-                'query_type': 'greeting'
-            })
+        with metrics.timer('chat_stage_seconds', stage='classify'):
+            parsed = parse_message(user_message)
+        if parsed.is_small_talk:
+            return jsonify(build_small_talk_response(user_message, parsed.message_type))
+        
+        with metrics.timer('chat_stage_seconds', stage='intent_and_catalog'):
+            intent, catalog_ready = resolve_intent_and_catalog(user_message)
+        return jsonify(build_shopping_response(user_message, intent, catalog_ready, parsed))
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        metrics.inc('app_errors_total', endpoint='chat', error=type(e).__name__)
         
-        elif message_type == 'general':
-            import random
-            responses = [
-                "I'm doing great, thanks for asking! How can I help you find products today?",
-                "I'm here and ready to help! What are you looking for?",
-                "All systems go! What products can I help you find?",
-                "I'm your shopping assistant - ready to help you discover awesome products!"
-            ]
-            return jsonify({
-                'success': True,
-                'reply': random.choice(responses),
-                'products': [],
-                'query_type': 'general'
+        return jsonify({
+            'success': False,
+            'reply': "Sorry, I'm having technical difficulties. Please try again.",
+            'products': []
+        }), 500
+
+@app.route('/chat/stream', methods=['POST'])
+@jwt_required(optional=True)
+@rate_limited(chat_limiter, 'chat')
+def chat_stream():
+    data = request.json or {}
+    user_message = data.get('message', '').strip()
+    use_sse = 'text/event-stream' in request.headers.get('Accept', '')
+    
+    def encode(event):
+        payload = json.dumps(event)
+        if use_sse:
+            return f"event: {event['type']}\ndata: {payload}\n\n"
+        return payload + "\n"
+    
+    def generate():
+        try:
+            for event in stream_chat_events(user_message):
+                yield encode(event)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield encode({
+                'type': 'error',
+                'success': False,
+                'reply': "Sorry, I'm having technical difficulties. Please try again."
             })
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if use_sse else 'application/x-ndjson'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/chat/batch', methods=['POST'])
+@jwt_required(optional=True)
+def chat_batch():
+    try:
+        data = request.json or {}
+        messages = data.get('messages')
+        if not isinstance(messages, list) or not messages:
+            return jsonify({'success': False,'error': 'messages must be a non-empty list'}), 400
+        if len(messages) > CHAT_BATCH_MAX:
+            return jsonify({'success': False,'error': f'At most {CHAT_BATCH_MAX} messages per batch'}), 400
         
-        min_rating = extract_rating_from_query(user_message)
-        intent = extract_product_intent(user_message)
+        messages = [str(m or '').strip() for m in messages]
+        unique_messages = list(dict.fromkeys(messages))
         
-        products = []
-        if intent.get('category') or (intent.get('keywords') and len(intent['keywords']) > 0):
-            products = search_fakestore_products(intent, min_rating)
+        # One catalog load for the whole batch; every search below reads
+        # the same cached snapshot.
+        try:
+            catalog.products()
+            catalog_ready = True
+        except Exception as e:
+            print(f"Catalog fetch failed: {e}")
+            catalog_ready = False
         
-        metadata = products[0].get('metadata', {}) if products else {}
-        ai_response = generate_ai_response(
-            user_message, 
-            products, 
-            intent.get('color'), 
-            min_rating,
-            metadata
-        )
+        responses = {}
+        intent_futures = {}
+        parsed_messages = {message: parse_message(message) for message in unique_messages}
+        shopping_messages = [m for m in unique_messages if not parsed_messages[m].is_small_talk]
         
-        formatted_products = []
-        for product in products:
-            rating = product.get('rating', {}).get('rate', 0)
-            color_detected = product.get('color_detected')   
-            formatted_products.append({
-                'id': product['id'],
-                'name': product['title'],
-                'price': f"${product['price']}",
-                'image': product['image'],
-                'url': f"/product/{product['id']}",
-                'category': product['category'],
-                'rating': f"{rating:.1f}/5",
-                'color': color_detected if color_detected else 'Various',
-                'match_score': product.get('match_score', 0),
-                'description': product.get('description', '')[:60] + "...",
-                'exact_color_match': product.get('has_color_match', False),
-                'metadata': product.get('metadata', {})
-            })
+        # Each shopping message costs a chat token, like a /chat call would.
+        # Messages past the caller's remaining tokens are answered with a
+        # per-item limit error; a batch with nothing admitted gets a 429.
+        rate_key = f"chat:{rate_limit_identity()}"
+        retry_after = None
+        try:
+            if not shopping_messages:
+                chat_limiter.check(rate_key)
+            for message in shopping_messages:
+                chat_limiter.check(rate_key)
+                intent_futures[message] = batch_pool.submit(extract_product_intent, message)
+        except LimitExceeded as e:
+            retry_after = e.retry_after
+            if not intent_futures:
+                return rate_limited_response('chat', retry_after)
+            metrics.inc('rate_limited_total', scope='chat')
         
-        response_data = {
-            'success': True,
-            'reply': ai_response,
-            'products': formatted_products,
-            'query_type': 'shopping',
-            'filters': {
-                'color_requested': intent.get('color'),
-                'min_rating': min_rating
-            },
-            'metadata': metadata
-        }
+        for message in unique_messages:
+            parsed = parsed_messages[message]
+            if parsed.is_small_talk:
+                responses[message] = build_small_talk_response(message, parsed.message_type)
+            elif message not in intent_futures:
+                responses[message] = {
+                    'success': False,
+                    'reply': 'Too many requests, please slow down',
+                    'products': [],
+                    'retry_after': retry_after
+                }
         
-        return jsonify(response_data)
+        for message, future in intent_futures.items():
+            try:
+                responses[message] = build_shopping_response(
+                    message, future.result(), catalog_ready, parsed_messages[message]
+                )
+            except Exception as e:
+                print(f"Batch chat message failed: {e}")
+                responses[message] = {
+                    'success': False,
+                    'reply': "Sorry, I'm having technical difficulties. Please try again.",
+                    'products': []
+                }
+        
+        return jsonify({
+            'success': True,
+            'results': [responses[message] for message in messages],
+            'count': len(messages),
+            'unique': len(unique_messages)
+        })
         
     except Exception as e:
         import traceback
         traceback.print_exc()
-        
-        return jsonify({
-            'success': False,
-            'reply': "Sorry, I'm having technical difficulties. Please try again.",
-            'products': []
-        }), 500
+        return jsonify({'success': False,'error': 'Batch chat failed'}), 500
+
+metrics.gauge('catalog_age_seconds', catalog.age)
+metrics.gauge('catalog_products', catalog.size)
+metrics.gauge('upstream_circuit_open', lambda: int(upstream.breaker.state == 'open'))
+metrics.gauge('llm_in_flight', lambda: llm_limiter.in_flight)
+metrics.gauge('intent_cache_entries', lambda: len(intent_cache))
+metrics.counter_fn('intent_cache_lookups_total', lambda: {
+    (('result', 'hit'),): intent_cache.hits,
+    (('result', 'miss'),): intent_cache.misses
+})
+metrics.counter_fn('intent_resolutions_total', lambda: {(('path', path),): count for path, count in intent_stats.items()})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/health', methods=['GET'])
 def health_check():
+    try:
+        user_count = users_repo.count()
+        store_ok = True
+    except Exception as e:
+        user_count = None
+        store_ok = False
+    
+    catalog_age = catalog.age()
+    catalog_ok = catalog_age is not None or upstream.breaker.state != 'open'
+    
+    if not store_ok:
+        status = 'unavailable'
+    elif not catalog_ok:
+        status = 'degraded'
+    else:
+        status = 'healthy'
+    
     return jsonify({
-        'status': 'healthy', 
+        'status': status, 
         'service': 'shopping-assistant',
         'features': ['chatbot', 'authentication', 'admin-dashboard'],
-        'jwt_enabled': True
-    })
+        'jwt_enabled': True,
+        'checks': {
+            'user_store': {'loaded': store_ok, 'backend': USER_STORE_BACKEND, 'users': user_count},
+            'catalog': {
+                'loaded': catalog_age is not None,
+                'age_seconds': round(catalog_age, 1) if catalog_age is not None else None,
+                'products': catalog.size(),
+                'upstream_circuit': upstream.breaker.state
+            },
+            'llm': {'available': client is not None},
+            'vector_scoring': {
+                'available': columnar_catalog is not None,
+                'min_products': VECTOR_SCORING_MIN
+            }
+        },
+        'intent_pipeline': {
+            'mode': INTENT_MODE,
+            'counts': dict(intent_stats),
+            'cache': intent_cache.stats()
+        }
+    }), 503 if not store_ok else 200
+
+if os.environ.get('CATALOG_SNAPSHOT'):
+    catalog.warm_from_snapshot(os.environ['CATALOG_SNAPSHOT'])
 
 if __name__ == '__main__':
-    load_users()
     app.run(debug=True, port=5000, host='127.0.0.1')
\ No newline at end of file
@@ -0,0 +1,263 @@
+import json
+import time
+import uuid
+import threading
+
+
+class ProductFeatures:
+    """Per-product text and color annotations computed once per load.
+
+    `tokens` is the product's set of search tokens; the columnar chat
+    scorer builds its keyword postings from it instead of re-tokenizing.
+    """
+
+    __slots__ = ('title', 'description', 'tokens', 'colors')
+
+    def __init__(self, title, description, tokens, colors):
+        self.title = title
+        self.description = description
+        self.tokens = tokens
+        self.colors = colors
+
+
+class ProductCatalog:
+    """Process-wide cache of the upstream product list.
+
+    One full fetch feeds every view (all products, per category, by id).
+    Once the TTL expires, readers keep getting the stale copy while a
+    single background thread refreshes it.
+    """
+
+    def __init__(self, fetch_fn, ttl=300, offline=False, enrich_fn=None):
+        self.fetch_fn = fetch_fn
+        self.enrich_fn = enrich_fn
+        self.ttl = ttl
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._overlay = {}
+        self._changed_at = {}
+        self._products = None
+        self._by_id = {}
+        self._by_category = {}
+        self._features = {}
+        self._loaded_at = 0
+        self.version = 0
+        # Versions restart with the process (and the in-memory overlay is
+        # lost), so clients pair them with the epoch they came from.
+        self.epoch = uuid.uuid4().hex[:12]
+        self._refreshing = False
+        self._listeners = []
+        self._change_listeners = []
+
+    def add_listener(self, fn):
+        """Call fn(products) after every (re)load, e.g. to rebuild an index."""
+        self._listeners.append(fn)
+        if self._products is not None:
+            fn(self._products)
+
+    def add_change_listener(self, fn):
+        """Call fn(changed_products, removed_ids) after every local write."""
+        self._change_listeners.append(fn)
+
+    def _merge(self, upstream):
+        # Local writes win over upstream; a None overlay entry is a delete.
+        seen = set()
+        merged = []
+        for product in upstream:
+            pid = product['id']
+            seen.add(pid)
+            if pid in self._overlay:
+                product = self._overlay[pid]
+            if product is not None:
+                merged.append(product)
+        merged.extend(p for pid, p in sorted(self._overlay.items()) if p is not None and pid not in seen)
+        return merged
+
+    def _install(self, upstream, loaded_at):
+        with self._write_lock:
+            products = self._merge(upstream)
+            by_id = {p['id']: p for p in products}
+            by_category = {}
+            for product in products:
+                by_category.setdefault(product.get('category'), []).append(product)
+            # Unchanged products keep their annotations; only new or edited
+            # ones are enriched again.
+            features = {}
+            changed = []
+            for pid, product in by_id.items():
+                if self._by_id.get(pid) == product and pid in self._features:
+                    features[pid] = self._features[pid]
+                else:
+                    changed.append(pid)
+                    if self.enrich_fn:
+                        features[pid] = self.enrich_fn(product)
+            changed.extend(pid for pid in self._by_id if pid not in by_id)
+            with self._lock:
+                self.version += 1
+                for pid in changed:
+                    self._changed_at[pid] = self.version
+                self._products = products
+                self._by_id = by_id
+                self._by_category = by_category
+                self._features = features
+                self._loaded_at = loaded_at
+            # Listeners run under the write lock so a rebuild can never
+            # land on top of a newer local write.
+            for listener in self._listeners:
+                try:
+                    listener(products)
+                except Exception as e:
+                    print(f"Catalog listener failed: {e}")
+
+    def _apply_write(self, product_id, product):
+        self._ensure_loaded()
+        with self._write_lock:
+            current = self._products or []
+            if product_id is None:
+                product_id = max([p['id'] for p in current] + list(self._overlay), default=0) + 1
+                product = dict(product, id=product_id)
+            previous = self._by_id.get(product_id)
+            if product is None and previous is None:
+                return None, None
+            self._overlay[product_id] = product
+
+            if product is None:
+                products = [p for p in current if p['id'] != product_id]
+            elif previous is not None:
+                products = [product if p['id'] == product_id else p for p in current]
+            else:
+                products = current + [product]
+            categories = {c for c in (previous and previous.get('category'), product and product.get('category'))}
+            features = self.enrich_fn(product) if self.enrich_fn and product is not None else None
+
+            with self._lock:
+                self.version += 1
+                self._changed_at[product_id] = self.version
+                self._products = products
+                by_id = dict(self._by_id)
+                by_category = dict(self._by_category)
+                self._features = dict(self._features)
+                if product is None:
+                    by_id.pop(product_id, None)
+                    self._features.pop(product_id, None)
+                else:
+                    by_id[product_id] = product
+                    if features is not None:
+                        self._features[product_id] = features
+                for category in categories:
+                    members = [p for p in products if p.get('category') == category]
+                    if members:
+                        by_category[category] = members
+                    else:
+                        by_category.pop(category, None)
+                self._by_id = by_id
+                self._by_category = by_category
+                version = self.version
+
+            for listener in self._change_listeners:
+                try:
+                    listener([product] if product is not None else [], [] if product is not None else [product_id])
+                except Exception as e:
+                    print(f"Catalog change listener failed: {e}")
+        return product, version
+
+    def create(self, fields):
+        """Add a local product with the next free id; returns (product, version)."""
+        return self._apply_write(None, fields)
+
+    def upsert(self, product):
+        """Store a local copy over the upstream one; returns (product, version)."""
+        return self._apply_write(product['id'], product)
+
+    def delete(self, product_id):
+        """Hide a product locally; returns the new version, or None if it did not exist."""
+        return self._apply_write(product_id, None)[1]
+
+    def changes_since(self, version, epoch=None):
+        """Return (current version, changed products, removed ids, reset) after version.
+
+        reset means the caller's version is from another process lifetime
+        and it has to reload the full catalog instead of applying a delta.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            current = self.version
+            if (epoch is not None and epoch != self.epoch) or version > current:
+                return current, [], [], True
+            changed_ids = [pid for pid, at in self._changed_at.items() if at > version]
+            by_id = self._by_id
+        changed = [by_id[pid] for pid in changed_ids if pid in by_id]
+        removed = [pid for pid in changed_ids if pid not in by_id]
+        return current, changed, removed, False
+
+    def warm_from_snapshot(self, path):
+        try:
+            with open(path, 'r') as f:
+                products = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading catalog snapshot: {e}")
+            return False
+        # A snapshot counts as stale so the first read triggers a refresh,
+        # unless we are running offline.
+        self._install(products, time.time() if self.offline else 0)
+        return True
+
+    def refresh(self):
+        self._install(self.fetch_fn(), time.time())
+        return self._products
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Catalog refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _ensure_loaded(self):
+        if self._products is None:
+            if self.offline:
+                return []
+            with self._load_lock:
+                if self._products is None:
+                    return self.refresh()
+        if not self.offline and self.age() > self.ttl:
+            self._refresh_in_background()
+        return self._products
+
+    def age(self):
+        if self._products is None:
+            return None
+        return time.time() - self._loaded_at
+
+    def size(self):
+        return len(self._products) if self._products is not None else 0
+
+    def products(self):
+        return self._ensure_loaded()
+
+    def by_category(self, category):
+        self._ensure_loaded()
+        return self._by_category.get(category, [])
+
+    def categories(self):
+        self._ensure_loaded()
+        return sorted(c for c in self._by_category if c)
+
+    def get(self, product_id):
+        self._ensure_loaded()
+        return self._by_id.get(product_id)
+
+    def features(self, product_id):
+        return self._features.get(product_id)
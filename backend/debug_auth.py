@@ -1,10 +1,8 @@
 import json
-import hashlib
 import sys
+from passwords import PasswordHasher
 
-def hash_password(password):
-    """Same hash function as in app.py"""
-    return hashlib.sha256(password.encode()).hexdigest()
+password_hasher = PasswordHasher()
 
 def diagnose():
     print("🔍 DIAGNOSING AUTHENTICATION ISSUE")
@@ -25,12 +23,12 @@ def diagnose():
             print(f"   Email: {admin.get('email')}")
             print(f"   Role: {admin.get('role')}")
             print(f"   Password hash in DB: {admin.get('password')}")
+            print(f"   Hash scheme: {admin.get('password', '').split('$')[0] if '$' in admin.get('password', '') else 'legacy sha256'}")
             
-            expected_hash = hash_password('admin123')
-            print(f"   Expected hash for 'admin123': {expected_hash}")
-            print(f"   Hashes match: {admin.get('password') == expected_hash}")
+            matches_default = password_hasher.verify('admin123', admin.get('password'))
+            print(f"   Password 'admin123' matches: {matches_default}")
             
-            if admin.get('password') != expected_hash:
+            if not matches_default:
                 print(f"\n❌ PASSWORD HASH MISMATCH!")
                 print(f"   This means either:")
                 print(f"   1. The password in DB is not 'admin123'")
@@ -40,9 +38,8 @@ def diagnose():
                 test_passwords = ['admin123', 'Admin123', 'ADMIN123', 'admin', 'admin@123']
                 print(f"\n🔑 Testing common password variations:")
                 for pwd in test_passwords:
-                    test_hash = hash_password(pwd)
-                    matches = test_hash == admin.get('password')
-                    print(f"   '{pwd}' -> {test_hash} {'✅ MATCHES!' if matches else ''}")
+                    matches = password_hasher.verify(pwd, admin.get('password'))
+                    print(f"   '{pwd}' {'✅ MATCHES!' if matches else '-> no match'}")
         else:
             print(f"\n❌ No admin user found in users.json!")
             
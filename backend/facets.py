@@ -0,0 +1,268 @@
+import bisect
+from collections import Counter
+
+from lexicon import COLOR_BITS
+from snapshot import Snapshot
+
+PRICE_BUCKETS = (25, 50, 100, 250, 500)
+RATING_THRESHOLDS = (4, 3, 2, 1)
+
+
+def price_bucket_labels():
+    edges = (0,) + PRICE_BUCKETS
+    labels = [f"{lo}-{hi}" for lo, hi in zip(edges, PRICE_BUCKETS)]
+    return labels + [f"{PRICE_BUCKETS[-1]}+"]
+
+
+PRICE_LABELS = price_bucket_labels()
+
+
+def _iter_bits(mask):
+    # bin() and str.find run in C, so walking k set bits costs k Python steps.
+    bits = bin(mask)[:1:-1]
+    i = bits.find('1')
+    while i != -1:
+        yield i
+        i = bits.find('1', i + 1)
+
+
+class FacetResult:
+    __slots__ = ('products', 'counts')
+
+    def __init__(self, products, counts):
+        self.products = products
+        self.counts = counts
+
+
+class _FacetState(Snapshot):
+    __slots__ = ('products', 'slot_of', 'price', 'rating', 'category', 'colors', 'buckets',
+                 'by_price', 'by_rating', 'live', 'category_masks', 'color_masks',
+                 'price_masks', 'rating_masks')
+
+    @classmethod
+    def empty(cls):
+        return cls(products=[], slot_of={}, price=[], rating=[], category=[], colors=[], buckets=[],
+                   by_price=[], by_rating=[], live=0, category_masks={}, color_masks={},
+                   price_masks=[0] * len(PRICE_LABELS), rating_masks=[0] * 6)
+
+    def copy(self):
+        # Shallow copies only; the products and tuples inside are shared.
+        fields = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            fields[name] = value.copy() if isinstance(value, (list, dict)) else value
+        return _FacetState(**fields)
+
+
+class FacetIndex:
+    """Filter the catalog by price, rating, category and color without a full scan.
+
+    Every product gets a slot. Categories, colors and facet buckets are
+    bitsets over slots, and price/rating are kept sorted so a range is two
+    bisects. Slots stay in catalog order, so results do too.
+    """
+
+    def __init__(self, features_fn):
+        self.features_fn = features_fn
+        self._state = _FacetState.empty()
+
+    def __len__(self):
+        return self._state.live.bit_count()
+
+    def build(self, products):
+        state = _FacetState.empty()
+        for product in products:
+            self._add(state, product)
+        state.by_price.sort()
+        state.by_rating.sort()
+        self._state = state
+
+    def _add(self, state, product, slot=None, keep_sorted=False):
+        price = float(product.get('price') or 0)
+        rating = float(product.get('rating', {}).get('rate', 0))
+        category = product.get('category')
+        colors = sum(COLOR_BITS[c] for c in self.features_fn(product).colors if c in COLOR_BITS)
+        if slot is None:
+            slot = len(state.products)
+            for column in (state.products, state.price, state.rating, state.category, state.colors, state.buckets):
+                column.append(None)
+        bit = 1 << slot
+
+        state.products[slot] = product
+        state.slot_of[product['id']] = slot
+        state.price[slot] = price
+        state.rating[slot] = rating
+        state.category[slot] = category
+        state.colors[slot] = colors
+        price_bucket = bisect.bisect_right(PRICE_BUCKETS, price)
+        rating_floor = min(int(rating), 5)
+        state.buckets[slot] = price_bucket * 6 + rating_floor
+        if keep_sorted:
+            bisect.insort(state.by_price, (price, slot))
+            bisect.insort(state.by_rating, (rating, slot))
+        else:
+            state.by_price.append((price, slot))
+            state.by_rating.append((rating, slot))
+
+        state.category_masks[category] = state.category_masks.get(category, 0) | bit
+        for color, color_bit in COLOR_BITS.items():
+            if colors & color_bit:
+                state.color_masks[color] = state.color_masks.get(color, 0) | bit
+        state.price_masks[price_bucket] |= bit
+        state.rating_masks[rating_floor] |= bit
+        state.live |= bit
+
+    @staticmethod
+    def _remove(state, product_id):
+        slot = state.slot_of.pop(product_id, None)
+        if slot is None:
+            return None
+        clear = ~(1 << slot)
+        for sorted_values, value in ((state.by_price, state.price[slot]), (state.by_rating, state.rating[slot])):
+            i = bisect.bisect_left(sorted_values, (value, slot))
+            if i < len(sorted_values) and sorted_values[i] == (value, slot):
+                del sorted_values[i]
+        state.category_masks = {c: m & clear for c, m in state.category_masks.items()}
+        state.color_masks = {c: m & clear for c, m in state.color_masks.items()}
+        state.price_masks = [m & clear for m in state.price_masks]
+        state.rating_masks = [m & clear for m in state.rating_masks]
+        state.live &= clear
+        state.products[slot] = None
+        return slot
+
+    def apply(self, changed=(), removed=()):
+        """Fold local edits in; an edited product keeps its slot, so its position."""
+        state = self._state.copy()
+        for product_id in removed:
+            self._remove(state, product_id)
+        for product in changed:
+            self._add(state, product, self._remove(state, product['id']), keep_sorted=True)
+        self._state = state
+
+    @staticmethod
+    def _range(sorted_values, low, high):
+        start = 0 if low is None else bisect.bisect_left(sorted_values, (low, -1))
+        end = len(sorted_values) if high is None else bisect.bisect_right(sorted_values, (high, float('inf')))
+        return sorted_values[start:end]
+
+    def query(self, category=None, color=None, price_min=None, price_max=None,
+              rating_min=None, rating_max=None):
+        """Return the matching products in catalog order plus facet counts over them."""
+        state = self._state
+        ranges = []
+        if price_min is not None or price_max is not None:
+            ranges.append(self._range(state.by_price, price_min, price_max))
+        if rating_min is not None or rating_max is not None:
+            ranges.append(self._range(state.by_rating, rating_min, rating_max))
+
+        if not ranges:
+            mask = state.live
+            if category is not None:
+                mask &= state.category_masks.get(category, 0)
+            if color is not None:
+                mask &= state.color_masks.get(color, 0)
+            return FacetResult([state.products[s] for s in _iter_bits(mask)], self._mask_counts(state, mask))
+
+        # Walk the narrowest range and check the other filters per slot:
+        # O(log n + k) for k products in that range.
+        slots = [slot for _, slot in min(ranges, key=len)]
+        color_bit = COLOR_BITS.get(color, 0) if color is not None else None
+        price_low = float('-inf') if price_min is None else price_min
+        price_high = float('inf') if price_max is None else price_max
+        rating_low = float('-inf') if rating_min is None else rating_min
+        rating_high = float('inf') if rating_max is None else rating_max
+        slots = sorted(
+            s for s in slots
+            if price_low <= state.price[s] <= price_high
+            and rating_low <= state.rating[s] <= rating_high
+            and (category is None or state.category[s] == category)
+            and (color_bit is None or state.colors[s] & color_bit)
+        )
+        return FacetResult([state.products[s] for s in slots], self._slot_counts(state, slots))
+
+    def counts_for(self, products):
+        """Facet counts for an arbitrary product list, e.g. text search hits."""
+        state = self._state
+        return self._slot_counts(state, [state.slot_of[p['id']] for p in products if p['id'] in state.slot_of])
+
+    @staticmethod
+    def _mask_counts(state, mask):
+        ratings = [(m & mask).bit_count() for m in state.rating_masks]
+        return {
+            'category': {c: n for c, m in sorted(state.category_masks.items(), key=lambda i: str(i[0]))
+                         if c and (n := (m & mask).bit_count())},
+            'color': {c: n for c, m in sorted(state.color_masks.items()) if (n := (m & mask).bit_count())},
+            'price': {label: (m & mask).bit_count() for label, m in zip(PRICE_LABELS, state.price_masks)},
+            'rating': {f"{t}+": sum(ratings[t:]) for t in RATING_THRESHOLDS}
+        }
+
+    @staticmethod
+    def _slot_counts(state, slots):
+        categories = Counter(map(state.category.__getitem__, slots))
+        colors, prices, ratings = Counter(), Counter(), Counter()
+        for bits, n in Counter(map(state.colors.__getitem__, slots)).items():
+            for color, bit in COLOR_BITS.items():
+                if bits & bit:
+                    colors[color] += n
+        for code, n in Counter(map(state.buckets.__getitem__, slots)).items():
+            prices[code // 6] += n
+            ratings[code % 6] += n
+        return {
+            'category': {c: categories[c] for c in sorted(categories, key=str) if c},
+            'color': dict(sorted(colors.items())),
+            'price': {label: prices[i] for i, label in enumerate(PRICE_LABELS)},
+            'rating': {f"{t}+": sum(ratings[r] for r in range(t, 6)) for t in RATING_THRESHOLDS}
+        }
+
+
+if __name__ == '__main__':
+    import time
+    import random
+    from vector_ranking import _synthetic_catalog
+    from lexicon import LEXICON
+
+    class _Features:
+        def __init__(self, product):
+            self.colors = LEXICON.colors_in(f"{product['title']} {product['description']}")
+
+    def scan(products, features, category, color, price_min, price_max, rating_min):
+        return [p for p in products
+                if (category is None or p['category'] == category)
+                and (color is None or color in features[p['id']].colors)
+                and (price_min is None or p['price'] >= price_min)
+                and (price_max is None or p['price'] <= price_max)
+                and (rating_min is None or p['rating']['rate'] >= rating_min)]
+
+    rng = random.Random(3)
+    for size in (1000, 10000, 100000):
+        products = _synthetic_catalog(size)
+        features = {p['id']: _Features(p) for p in products}
+        index = FacetIndex(lambda p: features[p['id']])
+        index.build(products)
+
+        queries = []
+        for _ in range(50):
+            low = rng.choice([None, 10, 100, 400])
+            queries.append((
+                rng.choice([None, 'electronics', 'jewelery']),
+                rng.choice([None, 'red', 'gold']),
+                low,
+                None if low is None else low + rng.choice([5, 20, 100]),
+                rng.choice([None, 4, 4.8])
+            ))
+
+        mismatches = sum(
+            [p['id'] for p in index.query(c, col, lo, hi, r).products]
+            != [p['id'] for p in scan(products, features, c, col, lo, hi, r)]
+            for c, col, lo, hi, r in queries
+        )
+        started = time.perf_counter()
+        for q in queries:
+            scan(products, features, *q)
+        scan_ms = (time.perf_counter() - started) / len(queries) * 1000
+        started = time.perf_counter()
+        for q in queries:
+            index.query(*q)
+        index_ms = (time.perf_counter() - started) / len(queries) * 1000
+        print(f"{size:>7} products: parity {len(queries) - mismatches}/{len(queries)}   "
+              f"scan {scan_ms:7.2f} ms/query   facets {index_ms:7.2f} ms/query (with counts)")
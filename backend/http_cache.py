@@ -0,0 +1,110 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are cheaper to send as-is than to compress.
+MIN_COMPRESS_SIZE = 1024
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick br or gzip from an Accept-Encoding header, or None for identity."""
+    offered = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        if offered.get(encoding, offered.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+class CachedBody:
+    """A rendered response body with its strong ETag and lazily compressed variants."""
+
+    __slots__ = ('body', 'etag', 'mimetype', 'headers', '_encoded', '_lock')
+
+    def __init__(self, body, mimetype='application/json', headers=None):
+        self.body = body.encode() if isinstance(body, str) else body
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.mimetype = mimetype
+        self.headers = headers or {}
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def variant_etag(self, encoding):
+        # Each encoding is a different representation, so it gets its own
+        # strong validator.
+        return f"{self.etag}-{encoding}" if encoding else self.etag
+
+    def encoded(self, encoding):
+        if encoding is None or len(self.body) < MIN_COMPRESS_SIZE:
+            return self.body, None
+        with self._lock:
+            data = self._encoded.get(encoding)
+            if data is None:
+                if encoding == 'br':
+                    data = brotli.compress(self.body, quality=5)
+                else:
+                    data = gzip.compress(self.body, compresslevel=6, mtime=0)
+                self._encoded[encoding] = data
+        return data, encoding
+
+    def to_response(self, request, cache_control='public, no-cache'):
+        data, encoding = self.encoded(negotiate_encoding(request.headers.get('Accept-Encoding')))
+        etag = self.variant_etag(encoding)
+        known = [self.variant_etag(e) for e in (None, 'gzip', 'br')]
+        if any(request.if_none_match.contains(tag) for tag in known):
+            response = Response(status=304)
+        else:
+            response = Response(data, mimetype=self.mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+            for name, value in self.headers.items():
+                response.headers[name] = value
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+class RenderCache:
+    """LRU of CachedBody objects keyed by (version, request key).
+
+    Bumping the version (a new catalog snapshot) makes old entries
+    unreachable; they age out of the LRU.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, version, key, render_fn):
+        cache_key = (version, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+                return entry
+        entry = render_fn()
+        with self._lock:
+            self._entries[cache_key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
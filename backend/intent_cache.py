@@ -0,0 +1,100 @@
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+
+_NON_WORD_RE = re.compile(r"[^\w\s'$.-]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    text = _NON_WORD_RE.sub(' ', (query or '').lower())
+    return _SPACE_RE.sub(' ', text).strip(' .')
+
+
+class IntentCache:
+    """Bounded LRU + TTL cache of LLM intent results keyed by normalized query."""
+
+    def __init__(self, max_size=1000, ttl=3600, persist_path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, query):
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, query, intent):
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = (time.time(), dict(intent))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, query, compute_fn):
+        intent = self.get(query)
+        if intent is None:
+            intent = compute_fn(query)
+            if intent is not None:
+                self.put(query, intent)
+        return intent
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
+
+    def load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return 0
+        try:
+            with open(self.persist_path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading intent cache: {e}")
+            return 0
+        now = time.time()
+        with self._lock:
+            for key, stored_at, intent in entries[-self.max_size:]:
+                if now - stored_at <= self.ttl:
+                    self._entries[key] = (stored_at, intent)
+        return len(self._entries)
+
+    def save(self):
+        if not self.persist_path:
+            return False
+        with self._lock:
+            entries = [[key, stored_at, intent] for key, (stored_at, intent) in self._entries.items()]
+        tmp_path = f"{self.persist_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f, separators=(',', ':'))
+            os.replace(tmp_path, self.persist_path)
+            return True
+        except OSError as e:
+            print(f"Error saving intent cache: {e}")
+            return False
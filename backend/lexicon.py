@@ -0,0 +1,150 @@
+import re
+
+# Single source of truth for the chatbot vocabulary. A word may map to
+# more than one color ("rose" is both red and pink).
+COLOR_SYNONYMS = {
+    'red': ['red', 'rose', 'ruby', 'crimson', 'scarlet', 'burgundy', 'maroon', 'cherry'],
+    'blue': ['blue', 'navy', 'azure', 'sky', 'cobalt', 'indigo', 'teal', 'turquoise'],
+    'green': ['green', 'emerald', 'forest', 'lime', 'olive', 'mint', 'sage', 'jade'],
+    'black': ['black', 'dark', 'onyx', 'ebony', 'charcoal', 'midnight', 'jet'],
+    'white': ['white', 'light', 'ivory', 'cream', 'snow', 'pearl', 'alabaster'],
+    'yellow': ['yellow', 'gold', 'golden', 'amber', 'mustard', 'lemon', 'sunflower'],
+    'pink': ['pink', 'rose', 'fuchsia', 'magenta', 'coral', 'salmon', 'blush'],
+    'purple': ['purple', 'violet', 'lavender', 'lilac', 'plum', 'mauve', 'orchid']
+}
+
+CATEGORY_KEYWORDS = {
+    'electronics': ['electronics', 'phone', 'laptop', 'tablet', 'computer', 'tv', 'headphone', 'earphone', 'charger'],
+    'jewelery': ['jewelry', 'jewellery', 'ring', 'necklace', 'bracelet', 'gold', 'silver', 'diamond', 'gem'],
+    "men's clothing": ["men's", 'men', 'shirt', 't-shirt', 'pants', 'jeans', 'jacket', 'hoodie', 'sweater'],
+    "women's clothing": ["women's", 'women', 'dress', 'skirt', 'blouse', 'bra', 'handbag', 'purse', 'heels']
+}
+
+STOP_WORDS = frozenset([
+    'the', 'and', 'for', 'you', 'me', 'show', 'want', 'need',
+    'looking', 'with', 'have', 'has', 'this', 'that', 'these', 'those'
+])
+
+RATING_WORDS = frozenset(['rating', 'ratings', 'star', 'stars', 'rated'])
+
+COLOR_NAMES = tuple(COLOR_SYNONYMS)
+COLOR_BITS = {color: 1 << i for i, color in enumerate(COLOR_NAMES)}
+
+
+class LexiconHits:
+    __slots__ = ('colors', 'categories', 'stop_words', 'terms')
+
+    def __init__(self):
+        self.colors = []
+        self.categories = []
+        self.stop_words = 0
+        self.terms = 0
+
+    @property
+    def color(self):
+        return self.colors[0] if self.colors else None
+
+    @property
+    def category(self):
+        return self.categories[0] if self.categories else None
+
+
+class Lexicon:
+    """Finds every color, category and stop-word hit in one regex pass."""
+
+    def __init__(self, colors, categories, stop_words):
+        self._terms = {}
+        for color, words in colors.items():
+            for word in words:
+                self._entry(word)[0].append(color)
+        for category, words in categories.items():
+            for word in words:
+                self._entry(word)[1].append(category)
+        for word in stop_words:
+            self._entry(word)[2] = True
+
+        # Longest first so "t-shirt" wins over "shirt" and "men's" over "men".
+        # Plain plurals ("dresses", "rings") resolve to the singular term.
+        alternation = '|'.join(re.escape(t) for t in sorted(self._terms, key=len, reverse=True))
+        self._pattern = re.compile(rf"(?<![a-z0-9])({alternation})(?:e?s)?(?![a-z0-9])")
+
+    def _entry(self, word):
+        return self._terms.setdefault(word, [[], [], False])
+
+    def scan(self, text):
+        hits = LexiconHits()
+        for match in self._pattern.finditer(text.lower()):
+            colors, categories, is_stop = self._terms[match.group(1)]
+            if colors or categories:
+                hits.terms += 1
+            for color in colors:
+                if color not in hits.colors:
+                    hits.colors.append(color)
+            for category in categories:
+                if category not in hits.categories:
+                    hits.categories.append(category)
+            if is_stop:
+                hits.stop_words += 1
+        return hits
+
+    def colors_in(self, text):
+        return set(self.scan(text).colors)
+
+
+LEXICON = Lexicon(COLOR_SYNONYMS, CATEGORY_KEYWORDS, STOP_WORDS)
+
+
+def _legacy_detect_colors(text):
+    detected = set()
+    text_lower = text.lower()
+    for color_name, color_words in COLOR_SYNONYMS.items():
+        if any(f' {word} ' in f' {text_lower} ' for word in color_words):
+            detected.add(color_name)
+    return detected
+
+
+def _legacy_intent_words(text):
+    color, category = None, None
+    for word in text.lower().split():
+        word = word.strip('.,!?')
+        for color_name, color_words in COLOR_SYNONYMS.items():
+            if word in color_words and not color:
+                color = color_name
+                break
+        if not category:
+            for name, words in CATEGORY_KEYWORDS.items():
+                if word in words:
+                    category = name
+                    break
+    return color, category
+
+
+if __name__ == '__main__':
+    import timeit
+
+    samples = [
+        "Show me red dresses under 50 dollars",
+        "looking for a navy blue men's jacket with 4 stars",
+        "gold necklace for my wife",
+        "Mens Casual Premium Slim Fit T-Shirts. Slim-fitting style, contrast raglan long sleeve, "
+        "three-button henley placket, light weight & soft fabric for breathable and comfortable wearing.",
+        "49 INCH SUPER ULTRAWIDE 32:9 CURVED GAMING MONITOR with dual 27 inch screen side by side",
+    ]
+    runs = 2000
+
+    def legacy():
+        for text in samples:
+            _legacy_detect_colors(text)
+            _legacy_intent_words(text)
+
+    def compiled():
+        for text in samples:
+            hits = LEXICON.scan(text)
+            hits.color, hits.category
+
+    legacy_time = timeit.timeit(legacy, number=runs)
+    compiled_time = timeit.timeit(compiled, number=runs)
+    per_text = runs * len(samples)
+    print(f"nested loops : {legacy_time / per_text * 1e6:8.2f} us/text")
+    print(f"compiled scan: {compiled_time / per_text * 1e6:8.2f} us/text")
+    print(f"speedup      : {legacy_time / compiled_time:8.2f}x")
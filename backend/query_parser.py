@@ -0,0 +1,253 @@
+import re
+
+GREETINGS = frozenset([
+    'hi', 'hello', 'hey', 'hii', 'hiii', 'hello there', 'hi there',
+    'good morning', 'good afternoon', 'good evening', 'gm', 'gn'
+])
+
+GENERAL_QUESTIONS = frozenset([
+    'how are you', "what's up", 'how do you do', 'sup',
+    'are you there', 'can you hear me', 'who are you',
+    'what can you do', 'help', 'what is your name'
+])
+
+# Phrases are looked up by their first word, then by exact n-gram.
+GENERAL_BY_FIRST_WORD = {}
+for _phrase in GENERAL_QUESTIONS:
+    GENERAL_BY_FIRST_WORD.setdefault(_phrase.split()[0], set()).add(len(_phrase.split()))
+
+UPPER_WORDS = frozenset(['under', 'below', 'less than', 'cheaper than', 'up to', 'at most',
+                         'no more than', 'max', 'maximum'])
+LOWER_WORDS = frozenset(['over', 'above', 'more than', 'greater than', 'at least', 'min',
+                         'minimum', 'from'])
+RATING_UNITS = ('star', 'rating', '/5')
+PRICE_UNITS = ('$', 'dollar', 'usd', 'buck')
+
+# Words a bound is read from; they say nothing about the product itself.
+BOUND_WORDS = frozenset(
+    [word for phrase in UPPER_WORDS | LOWER_WORDS for word in phrase.split()]
+    + ['between', 'dollar', 'dollars', 'usd', 'buck', 'bucks']
+)
+BOUND_NUMBER_RE = re.compile(r"\$?\d+(?:\.\d+)?(?:\+|/5|-\$?\d+(?:\.\d+)?)?")
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+DIGIT_RE = re.compile(r"\d")
+
+_NUM = r"\d+(?:\.\d+)?"
+_UNIT = r"(?:\s*(stars?|ratings?|/5|dollars?|usd|bucks?))?"
+_CMP = '|'.join(re.escape(w).replace(r'\ ', r'\s+')
+                for w in sorted(UPPER_WORDS | LOWER_WORDS, key=len, reverse=True))
+
+# One alternation for every rating and price expression; finditer walks
+# the message once and only tries it at word starts. Group layout, by
+# alternative:
+#   range   "4 to 5 stars", "between $20 and $50", "$20-50"
+#   bound   "above 4", "under $50", "at least 4.5 stars"
+#   plain   "4 stars", "4+ stars", "4/5"
+#   rated   "rating of 4", "rated 4.5"
+QUERY_RE = re.compile(
+    rf"(?<![\w.$])(?:(between\s+|from\s+)?(\$)?({_NUM})\s*(?:-|to|and)\s*(\$)?({_NUM}){_UNIT}"
+    rf"|({_CMP})\s+(\$)?\s*({_NUM})(\+)?{_UNIT}"
+    rf"|(\$)?({_NUM})(\+)?\s*(stars?|ratings?|/5)"
+    rf"|(?:rating\s*of|rated)\s*({_NUM}))"
+)
+
+
+class ParsedQuery:
+    """Everything the chat pipeline reads off a message before intent extraction."""
+
+    __slots__ = ('message_type', 'rating_min', 'rating_max', 'price_min', 'price_max')
+
+    def __init__(self, message_type=None):
+        self.message_type = message_type
+        self.rating_min = None
+        self.rating_max = None
+        self.price_min = None
+        self.price_max = None
+
+    @property
+    def is_small_talk(self):
+        return self.message_type in ('greeting', 'general')
+
+    @property
+    def has_bounds(self):
+        return any(getattr(self, name) is not None
+                   for name in ('rating_min', 'rating_max', 'price_min', 'price_max'))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _clamp_rating(value):
+    return min(max(value, 1), 5)
+
+
+def _is_price(currency, unit, value):
+    if currency or (unit and unit.startswith(PRICE_UNITS)):
+        return True
+    if unit and unit.startswith(RATING_UNITS):
+        return False
+    # A bare number only reads as a rating when it could be one.
+    return value > 5
+
+
+def _set_bound(parsed, is_price, attr, value):
+    name = ('price_' if is_price else 'rating_') + attr
+    if getattr(parsed, name) is None:
+        setattr(parsed, name, value if is_price else _clamp_rating(value))
+
+
+def strip_bound_words(keywords):
+    """Drop comparator words, units and numbers a price or rating bound was read from."""
+    return [k for k in keywords if k not in BOUND_WORDS and not BOUND_NUMBER_RE.fullmatch(k)]
+
+
+def classify(lowered, words):
+    # A greeting must open the message and be followed by a space or
+    # nothing: "hi there" is small talk, "hi, show me dresses" is not.
+    # Greetings are at most two words, so splitting on single spaces and
+    # looking up the first one or two parts matches that rule exactly.
+    parts = lowered.split(' ', 2)
+    if parts[0] in GREETINGS or ' '.join(parts[:2]) in GREETINGS:
+        return 'greeting'
+    if GENERAL_BY_FIRST_WORD.keys().isdisjoint(words):
+        return None
+    for i, word in enumerate(words):
+        for size in GENERAL_BY_FIRST_WORD.get(word, ()):
+            if ' '.join(words[i:i + size]) in GENERAL_QUESTIONS:
+                return 'general'
+    return None
+
+
+def parse_message(text):
+    """Classify a chat message and pull rating and price bounds out of it."""
+    lowered = text.lower().strip()
+    parsed = ParsedQuery(classify(lowered, WORD_RE.findall(lowered)))
+    # Every rating or price expression has a digit in it.
+    if parsed.is_small_talk or not DIGIT_RE.search(lowered):
+        return parsed
+
+    for match in QUERY_RE.finditer(lowered):
+        (between, cur_lo, lo, cur_hi, hi, range_unit,
+         cmp, cmp_cur, cmp_num, cmp_plus, cmp_unit,
+         plain_cur, plain_num, plain_plus, plain_unit,
+         rated_num) = match.groups()
+
+        if lo is not None:
+            lo, hi = float(lo), float(hi)
+            currency = cur_lo or cur_hi
+            # "2 to 3" on its own is too vague to be a filter.
+            if not (between or currency or range_unit):
+                continue
+            is_price = _is_price(currency, range_unit, max(lo, hi))
+            _set_bound(parsed, is_price, 'min', min(lo, hi))
+            _set_bound(parsed, is_price, 'max', max(lo, hi))
+        elif cmp is not None:
+            value = float(cmp_num)
+            is_price = _is_price(cmp_cur, cmp_unit, value)
+            upper = ' '.join(cmp.split()) in UPPER_WORDS and not cmp_plus
+            _set_bound(parsed, is_price, 'max' if upper else 'min', value)
+        elif plain_num is not None:
+            if plain_cur:
+                continue
+            _set_bound(parsed, False, 'min', float(plain_num))
+        else:
+            _set_bound(parsed, False, 'min', float(rated_num))
+    return parsed
+
+
+def _legacy_detect_greeting_or_general(message):
+    message_lower = message.lower().strip()
+    greetings = [
+        'hi', 'hello', 'hey', 'hii', 'hiii', 'hello there', 'hi there',
+        'good morning', 'good afternoon', 'good evening', 'gm', 'gn'
+    ]
+    general_questions = [
+        'how are you', "what's up", 'how do you do', 'sup',
+        'are you there', 'can you hear me', 'who are you',
+        'what can you do', 'help', 'what is your name'
+    ]
+    if any(message_lower == greet or message_lower.startswith(greet + ' ') for greet in greetings):
+        return 'greeting'
+    if any(question in message_lower for question in general_questions):
+        return 'general'
+    return None
+
+
+def _legacy_extract_rating(query):
+    patterns = [
+        r'(\d+(?:\.\d+)?)\s*stars?',
+        r'(\d+(?:\.\d+)?)\s*ratings?',
+        r'rating\s*of\s*(\d+(?:\.\d+)?)',
+        r'rated\s*(\d+(?:\.\d+)?)',
+        r'(\d+(?:\.\d+)?)\s*star',
+        r'(\d+(?:\.\d+)?)/5'
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, query.lower())
+        if match:
+            return min(max(float(match.group(1)), 1), 5)
+    return None
+
+
+SAMPLE_MESSAGES = [
+    "hi",
+    "Hello there!",
+    "good morning, can you help me find a jacket",
+    "hi, show me red dresses",
+    "hey! I need a laptop",
+    "how are you?",
+    "what can you do",
+    "show me red dresses",
+    "navy blue men's jacket with 4 stars",
+    "gold necklace rated 4.5",
+    "laptops with rating of 4 or more",
+    "t-shirts 4+ stars under $30",
+    "rings between $100 and $500",
+    "women's clothing 4 to 5 stars",
+    "electronics above 4",
+    "backpack under 50 dollars",
+    "super soft hoodie below $40 with at least 4.5 stars",
+    "cheap monitor 3/5 or better",
+    "silver bracelet from $20-$60",
+    "I need a charger",
+    "Mens Casual Premium Slim Fit T-Shirts",
+    "49 inch gaming monitor over 200 dollars",
+]
+
+
+if __name__ == '__main__':
+    import sys
+    import timeit
+
+    # Pass a file with one chat message per line to benchmark real logs;
+    # otherwise the built-in sample set is used.
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r') as f:
+            corpus = [line.strip() for line in f if line.strip()]
+    else:
+        corpus = SAMPLE_MESSAGES
+
+    for message in corpus[:len(SAMPLE_MESSAGES)]:
+        parsed = parse_message(message)
+        legacy = (_legacy_detect_greeting_or_general(message), _legacy_extract_rating(message))
+        bounds = {k: v for k, v in parsed.to_dict().items() if v is not None and k != 'message_type'}
+        print(f"{message[:48]:<48} {str(parsed.message_type):<8} {bounds}  legacy={legacy}")
+
+    runs = 500
+
+    def legacy():
+        for message in corpus:
+            if _legacy_detect_greeting_or_general(message) is None:
+                _legacy_extract_rating(message)
+
+    def compiled():
+        for message in corpus:
+            parse_message(message)
+
+    legacy_time = timeit.timeit(legacy, number=runs)
+    compiled_time = timeit.timeit(compiled, number=runs)
+    per_message = runs * len(corpus)
+    print(f"\nlegacy two-stage : {legacy_time / per_message * 1e6:8.2f} us/message")
+    print(f"compiled parser  : {compiled_time / per_message * 1e6:8.2f} us/message")
+    print(f"speedup          : {legacy_time / compiled_time:8.2f}x")
@@ -0,0 +1,70 @@
+import heapq
+
+TOP_K = 6
+
+
+class ScoredProduct:
+    """A ranked reference to a catalog product; the product itself is never mutated."""
+
+    __slots__ = ('product', 'score', 'color', 'seq')
+
+    def __init__(self, product, score, color, seq):
+        self.product = product
+        self.score = score
+        self.color = color
+        self.seq = seq
+
+    @property
+    def color_match(self):
+        return self.color is not None
+
+
+def select_top_k(results, k=TOP_K):
+    # Ties keep catalog order, like the stable sort this replaces.
+    return heapq.nlargest(k, results, key=lambda r: (r.score, -r.seq))
+
+
+def rank_products(products, features_fn, keywords, user_color=None, min_rating=None, k=TOP_K):
+    """Score products against a chat intent and keep the best k.
+
+    Returns (results, metadata); metadata describes the whole candidate
+    set and is meant to be sent once per response.
+    """
+    keywords = [keyword.lower() for keyword in keywords if keyword and len(keyword) > 2]
+    match_all = not keywords and not user_color
+
+    available_colors = set()
+    exact_color_matches = []
+    other_products = []
+
+    for seq, product in enumerate(products):
+        rating = product.get('rating', {}).get('rate', 0)
+        if min_rating and rating < min_rating:
+            continue
+
+        features = features_fn(product)
+        available_colors.update(features.colors)
+        has_color_match = bool(user_color) and user_color in features.colors
+
+        score = 0
+        if keywords and any(keyword in features.title or keyword in features.description
+                            for keyword in keywords):
+            score += 3
+        if has_color_match:
+            score += 5
+        elif user_color:
+            score -= 2
+        if rating >= 4.5:
+            score += 1
+
+        if has_color_match:
+            exact_color_matches.append(ScoredProduct(product, score, user_color, seq))
+        elif score > 0 or match_all:
+            other_products.append(ScoredProduct(product, score, None, seq))
+
+    metadata = {
+        'exact_color_found': bool(exact_color_matches),
+        'available_colors': sorted(available_colors),
+        'color_detected_in_any': bool(exact_color_matches)
+    }
+    return select_top_k(exact_color_matches or other_products, k), metadata
@@ -0,0 +1,92 @@
+import math
+import time
+import threading
+from collections import OrderedDict
+
+
+class LimitExceeded(Exception):
+    """Raised when a limiter has no capacity left; retry_after is in seconds."""
+
+    def __init__(self, retry_after=1):
+        super().__init__(f"Rate limit exceeded, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class InMemoryBuckets:
+    """Token bucket state kept in this process.
+
+    Anything with the same take() signature can replace it, e.g. a shared
+    store when the app runs as several workers. Idle keys are evicted
+    least-recently-used first so one-off clients do not grow it forever.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1):
+        """Spend cost tokens from key's bucket; returns seconds to wait, 0 if allowed."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RateLimiter:
+    """Per-identity token bucket: `per_minute` sustained, `burst` at once."""
+
+    def __init__(self, backend, per_minute, burst):
+        self.backend = backend
+        self.rate = per_minute / 60.0
+        self.burst = burst
+
+    def check(self, key, cost=1):
+        wait = self.backend.take(key, self.rate, self.burst, cost)
+        if wait > 0:
+            raise LimitExceeded(max(1, math.ceil(wait)))
+
+
+class ConcurrencyLimiter:
+    """Caps how many callers may be inside a section at once, without queueing."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def acquire(self):
+        with self._lock:
+            if self._in_flight >= self.limit:
+                raise LimitExceeded()
+            self._in_flight += 1
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def create_rate_limit_backend(backend='memory', **options):
+    if backend == 'memory':
+        return InMemoryBuckets(**options)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
@@ -0,0 +1,178 @@
+import re
+import math
+import bisect
+
+from snapshot import Snapshot
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+TITLE_WEIGHT = 2
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class SearchIndex:
+    """Inverted index over product titles and descriptions.
+
+    Built once per catalog refresh. Every query token is matched as a
+    prefix of indexed tokens (so "jack" finds "jacket") and results are
+    ranked with BM25, title hits counting double.
+    """
+
+    def __init__(self, products=(), k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.build(products)
+
+    def build(self, products):
+        products = list(products)
+        postings = {}
+        doc_len = {}
+        for product in products:
+            pid = product['id']
+            tf = _term_frequencies(product)
+            doc_len[pid] = sum(tf.values())
+            for token, count in tf.items():
+                postings.setdefault(token, {})[pid] = count
+
+        # Swapped in as one object so readers never see a half-built index.
+        self._state = _IndexState(
+            products=products,
+            by_id={p['id']: p for p in products},
+            position={p['id']: i for i, p in enumerate(products)},
+            postings=postings,
+            vocab=sorted(postings),
+            doc_len=doc_len,
+            avg_len=(sum(doc_len.values()) / len(doc_len)) if doc_len else 0
+        )
+
+    def apply(self, changed=(), removed=()):
+        """Fold a few edited or removed products into the index.
+
+        Only the touched documents are re-tokenized; posting lists are
+        copied on write so concurrent searches keep a consistent view.
+        """
+        state = self._state
+        changed = list(changed)
+        touched = {p['id'] for p in changed} | set(removed)
+        postings = dict(state.postings)
+        doc_len = dict(state.doc_len)
+        copied = set()
+        vocab_changed = False
+
+        def posting_for(token):
+            if token not in copied:
+                postings[token] = dict(postings.get(token, {}))
+                copied.add(token)
+            return postings[token]
+
+        for pid in touched:
+            old = state.by_id.get(pid)
+            if old is None:
+                continue
+            for token in _term_frequencies(old):
+                posting = posting_for(token)
+                posting.pop(pid, None)
+                if not posting:
+                    del postings[token]
+                    copied.discard(token)
+                    vocab_changed = True
+            doc_len.pop(pid, None)
+
+        for product in changed:
+            pid = product['id']
+            tf = _term_frequencies(product)
+            doc_len[pid] = sum(tf.values())
+            for token, count in tf.items():
+                vocab_changed = vocab_changed or token not in postings
+                posting_for(token)[pid] = count
+
+        removed = set(removed)
+        replacements = {p['id']: p for p in changed}
+        products = [replacements.get(p['id'], p) for p in state.products if p['id'] not in removed]
+        products.extend(p for p in changed if p['id'] not in state.by_id)
+        by_id = {pid: p for pid, p in state.by_id.items() if pid not in removed}
+        by_id.update(replacements)
+
+        self._state = _IndexState(
+            products=products,
+            by_id=by_id,
+            position={p['id']: i for i, p in enumerate(products)},
+            postings=postings,
+            vocab=sorted(postings) if vocab_changed else state.vocab,
+            doc_len=doc_len,
+            avg_len=(sum(doc_len.values()) / len(doc_len)) if doc_len else 0
+        )
+
+    def __len__(self):
+        return len(self._state.products)
+
+    def expand(self, prefix, limit=None, state=None):
+        vocab = (state or self._state).vocab
+        start = bisect.bisect_left(vocab, prefix)
+        end = bisect.bisect_left(vocab, prefix + '\uffff', start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return vocab[start:end]
+
+    def search(self, query, limit=None, offset=0, rank=True, allowed=None):
+        """Return (matching products, total match count).
+
+        `allowed` is an optional set of product ids, e.g. from the facet
+        index; postings outside it are skipped rather than filtered after.
+        """
+        state = self._state
+        end = offset + limit if limit else None
+        terms = tokenize(query)
+        if not terms:
+            products = state.products if allowed is None else [p for p in state.products if p['id'] in allowed]
+            return products[offset:end], len(products)
+
+        n = len(state.products)
+        avg_len = state.avg_len or 1
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for token in self.expand(term, state=state):
+                posting = state.postings[token]
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for pid, tf in posting.items():
+                    if allowed is not None and pid not in allowed:
+                        continue
+                    norm = 1 - self.b + self.b * state.doc_len[pid] / avg_len
+                    weight = idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+                    term_scores[pid] = term_scores.get(pid, 0) + weight
+            if scores is None:
+                scores = term_scores
+            else:
+                # Every query term has to match.
+                scores = {pid: s + term_scores[pid] for pid, s in scores.items() if pid in term_scores}
+            if not scores:
+                return [], 0
+
+        if rank:
+            # Ties keep catalog order whatever order the postings were built in.
+            ids = sorted(scores, key=lambda pid: (-scores[pid], state.position[pid]))
+        else:
+            ids = [p['id'] for p in state.products if p['id'] in scores]
+        return [state.by_id[pid] for pid in ids[offset:end]], len(ids)
+
+    def suggest(self, prefix, limit=10):
+        terms = tokenize(prefix)
+        if not terms:
+            return []
+        return self.expand(terms[-1], limit)
+
+
+def _term_frequencies(product):
+    tf = {}
+    for token in tokenize(product.get('title')):
+        tf[token] = tf.get(token, 0) + TITLE_WEIGHT
+    for token in tokenize(product.get('description')):
+        tf[token] = tf.get(token, 0) + 1
+    return tf
+
+
+class _IndexState(Snapshot):
+    __slots__ = ('products', 'by_id', 'position', 'postings', 'vocab', 'doc_len', 'avg_len')
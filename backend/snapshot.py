@@ -0,0 +1,13 @@
+class Snapshot:
+    """Fields of an index that are published together as one object.
+
+    Subclasses list their fields in __slots__. Writers build a new
+    snapshot and assign it in one step; readers grab the reference once
+    per call and never see a mix of old and new fields.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
@@ -0,0 +1,122 @@
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures.
+
+    While open every call fails fast; after `reset_timeout` seconds one
+    trial call is let through (half-open) and its outcome decides whether
+    the circuit closes again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class UpstreamClient:
+    """Keep-alive HTTP client for the product API.
+
+    Every call has a (connect, read) timeout, transient failures are
+    retried with jittered exponential backoff, and a circuit breaker stops
+    hammering an upstream that keeps failing.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url, timeout=(3.05, 10), retries=2, backoff=0.2,
+                 pool_size=10, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _sleep_before_retry(self, attempt):
+        delay = self.backoff * (2 ** attempt)
+        time.sleep(random.uniform(0, delay))
+
+    def get_json(self, path, timeout=None, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Upstream circuit open for {self.base_url}")
+
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        last_error = None
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(url, timeout=timeout or self.timeout, **kwargs)
+                if response.status_code in self.RETRY_STATUSES:
+                    raise requests.HTTPError(f"{response.status_code} from {url}", response=response)
+                response.raise_for_status()
+                data = response.json()
+                self.breaker.record_success()
+                return data
+            except (requests.RequestException, ValueError) as e:
+                last_error = e
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                retryable = status is None or status in self.RETRY_STATUSES
+                if not retryable:
+                    # The upstream answered; a 4xx says nothing about its health.
+                    self.breaker.record_success()
+                    raise
+                if attempt == self.retries:
+                    break
+                self._sleep_before_retry(attempt)
+            except Exception:
+                # Every attempt must record an outcome, or a half-open
+                # trial would stay in flight and the breaker never close.
+                self.breaker.record_failure()
+                raise
+
+        self.breaker.record_failure()
+        raise last_error
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,541 @@
+import os
+import json
+import base64
+import bisect
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+
+
+def write_json_atomic(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.users-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class WriteBehindWriter:
+    """Coalesces mutations and runs one flush per interval or batch.
+
+    Flushes are serialized, so concurrent requests never interleave
+    partial writes of the same file.
+    """
+
+    def __init__(self, flush_fn, flush_interval=2.0, batch_size=100):
+        self.flush_fn = flush_fn
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending = 0
+        self._timer = None
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def schedule(self):
+        flush_now = False
+        with self._lock:
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                flush_now = True
+            else:
+                self._arm_timer()
+        if flush_now:
+            self.flush()
+
+    def _arm_timer(self):
+        # Caller holds self._lock.
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._pending:
+                    return True
+                self._pending = 0
+            try:
+                self.flush_fn()
+                return True
+            except Exception as e:
+                print(f"Error flushing users: {e}")
+                # Keep the data dirty and retry on the next interval, even
+                # if no further mutation comes in to schedule one.
+                with self._lock:
+                    self._pending += 1
+                    self._arm_timer()
+                return False
+
+
+USER_SORT_KEYS = ('created_at', 'email', 'name')
+
+
+def encode_cursor(user, sort):
+    raw = json.dumps([user.get(sort) or '', user['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, user_id = json.loads(raw)
+        return str(sort_value), str(user_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+class UserQuery:
+    """Filters, sort order and keyset position for admin user listings."""
+
+    __slots__ = ('role', 'email_prefix', 'created_after', 'created_before', 'sort', 'descending', 'after')
+
+    def __init__(self, role=None, email_prefix=None, created_after=None, created_before=None,
+                 sort='created_at', descending=False, after=None):
+        if sort not in USER_SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(USER_SORT_KEYS)}")
+        self.role = role
+        self.email_prefix = email_prefix.lower() if email_prefix else None
+        self.created_after = created_after
+        self.created_before = created_before
+        self.sort = sort
+        self.descending = descending
+        self.after = decode_cursor(after) if after else None
+
+    def matches(self, user):
+        if self.role and user.get('role') != self.role:
+            return False
+        if self.email_prefix and not user['email'].lower().startswith(self.email_prefix):
+            return False
+        created = user.get('created_at') or ''
+        if self.created_after and created < self.created_after:
+            return False
+        if self.created_before and created >= self.created_before:
+            return False
+        return True
+
+    def sort_key(self, user):
+        return (user.get(self.sort) or '', user['id'])
+
+
+class UserRepository:
+    """In-memory view of the users file, indexed by email and id.
+
+    The file is only re-read when its mtime changes, so lookups on the
+    auth hot paths are dict hits instead of a full JSON parse. Mutations
+    are applied in memory and persisted by a WriteBehindWriter. Admin
+    listings walk a per-sort-key (value, id) index, so a page starts with
+    a bisect to the cursor instead of a full sort.
+    """
+
+    def __init__(self, path, load_fn, flush_interval=2.0, batch_size=100):
+        self.path = path
+        self._load_fn = load_fn
+        self._lock = threading.RLock()
+        self._users = []
+        self._by_email = {}
+        self._by_id = {}
+        self._sorted = {}
+        self._mtime = None
+        self._loaded = False
+        self.generation = 0
+        self._writer = WriteBehindWriter(self._flush, flush_interval, batch_size)
+
+    def _file_mtime(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def _index(self, users):
+        self._users = users
+        self._by_email = {u['email']: u for u in users}
+        self._by_id = {u['id']: u for u in users}
+        self._sorted = {}
+
+    def _sorted_keys(self, sort):
+        keys = self._sorted.get(sort)
+        if keys is None:
+            with self._lock:
+                keys = sorted((u.get(sort) or '', u['id']) for u in self._users)
+                self._sorted[sort] = keys
+        return keys
+
+    def _reindex(self, user, old=None):
+        # Copy-on-write, so a listing already walking a key list is not
+        # shifted under it. Caller holds self._lock.
+        for sort, keys in list(self._sorted.items()):
+            new_key = (user.get(sort) or '', user['id'])
+            old_key = (old.get(sort) or '', old['id']) if old is not None else None
+            if new_key == old_key:
+                continue
+            keys = list(keys)
+            if old_key is not None:
+                i = bisect.bisect_left(keys, old_key)
+                if i < len(keys) and keys[i] == old_key:
+                    del keys[i]
+            bisect.insort(keys, new_key)
+            self._sorted[sort] = keys
+
+    def _ensure_fresh(self):
+        # Unflushed mutations make memory the source of truth.
+        if self._loaded and self._writer.pending:
+            return
+        mtime = self._file_mtime()
+        if self._loaded and mtime == self._mtime:
+            return
+        with self._lock:
+            mtime = self._file_mtime()
+            if self._loaded and (self._writer.pending or mtime == self._mtime):
+                return
+            self._index(self._load_fn())
+            self._mtime = self._file_mtime()
+            self._loaded = True
+            self.generation += 1
+
+    def _flush(self):
+        with self._lock:
+            snapshot = [dict(u) for u in self._users]
+            write_json_atomic(self.path, snapshot)
+            self._mtime = self._file_mtime()
+
+    def load(self):
+        with self._lock:
+            self._loaded = False
+        self._ensure_fresh()
+        return len(self._users)
+
+    def flush(self):
+        return self._writer.flush()
+
+    def all(self):
+        self._ensure_fresh()
+        return list(self._users)
+
+    def count(self):
+        self._ensure_fresh()
+        return len(self._users)
+
+    def find_by_email(self, email):
+        self._ensure_fresh()
+        return self._by_email.get(email)
+
+    def find_by_id(self, user_id):
+        self._ensure_fresh()
+        return self._by_id.get(user_id)
+
+    def add(self, user):
+        self._ensure_fresh()
+        with self._lock:
+            if user['email'] in self._by_email:
+                return False
+            self._users.append(user)
+            self._by_email[user['email']] = user
+            self._by_id[user['id']] = user
+            self._reindex(user)
+        # New accounts are flushed right away; losing one is worse than
+        # losing a last_login timestamp.
+        self._writer.schedule()
+        self._writer.flush()
+        return True
+
+    def update(self, user_id, **fields):
+        self._ensure_fresh()
+        with self._lock:
+            user = self._by_id.get(user_id)
+            if not user:
+                return None
+            old = {sort: user.get(sort) for sort in self._sorted}
+            old['id'] = user['id']
+            user.update(fields)
+            self._reindex(user, old)
+        self._writer.schedule()
+        return user
+
+    def iter_users(self, query):
+        self._ensure_fresh()
+        keys = self._sorted_keys(query.sort)
+        if query.descending:
+            end = bisect.bisect_left(keys, query.after) if query.after else len(keys)
+            rows = range(end - 1, -1, -1)
+        else:
+            start = bisect.bisect_right(keys, query.after) if query.after else 0
+            rows = range(start, len(keys))
+        by_id = self._by_id
+        for i in rows:
+            user = by_id.get(keys[i][1])
+            if user is not None and query.matches(user):
+                yield user
+
+
+class ProfileCache:
+    """Short-TTL cache of serialized user profiles keyed by user id."""
+
+    def __init__(self, ttl=30, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() > expires_at:
+            self.invalidate(user_id)
+            return None
+        return value
+
+    def put(self, user_id, value):
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._entries.clear()
+            self._entries[user_id] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def _parse_timestamp(value):
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class UserStats:
+    """Admin dashboard counters kept up to date on register/login events.
+
+    Rebuilt from the store once on startup (or when the store reloads);
+    reading a snapshot is O(1) apart from evicting expired signups.
+    """
+
+    def __init__(self, window=timedelta(days=7)):
+        self.window = window
+        self.generation = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.total = 0
+        self._by_role = Counter()
+        self._signups = deque()
+        self._active_day = None
+        self._active_ids = set()
+
+    def rebuild(self, users, generation=None, now=None):
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._reset()
+            signups = []
+            for user in users:
+                self.total += 1
+                self._by_role[user.get('role', 'user')] += 1
+                if user.get('created_at'):
+                    created = _parse_timestamp(user['created_at'])
+                    if created > now - self.window:
+                        signups.append(created)
+                if user.get('last_login'):
+                    self._note_login(user['id'], _parse_timestamp(user['last_login']), now)
+            self._signups.extend(sorted(signups))
+            self.generation = generation
+
+    def _note_login(self, user_id, when, now):
+        today = now.date()
+        if self._active_day != today:
+            self._active_day = today
+            self._active_ids = set()
+        if when.date() == today:
+            self._active_ids.add(user_id)
+
+    def record_signup(self, user):
+        with self._lock:
+            self.total += 1
+            self._by_role[user.get('role', 'user')] += 1
+            self._signups.append(_parse_timestamp(user['created_at']))
+
+    def record_login(self, user_id, when=None):
+        when = when or datetime.utcnow()
+        with self._lock:
+            self._note_login(user_id, when, when)
+
+    def snapshot(self, now=None):
+        now = now or datetime.utcnow()
+        with self._lock:
+            cutoff = now - self.window
+            while self._signups and self._signups[0] <= cutoff:
+                self._signups.popleft()
+            if self._active_day != now.date():
+                self._active_day = now.date()
+                self._active_ids = set()
+            admin_users = self._by_role['admin']
+            return {
+                'total_users': self.total,
+                'admin_users': admin_users,
+                'regular_users': self.total - admin_users,
+                'recent_users': len(self._signups),
+                'active_today': len(self._active_ids)
+            }
+
+
+USER_COLUMNS = ('id', 'name', 'email', 'password', 'role', 'created_at', 'last_login')
+
+
+class SqliteUserStore:
+    """SQLite-backed store with the same interface as UserRepository.
+
+    Email lookups hit a unique index and the stats queries use the
+    role/created_at indexes, so nothing scans the full user list.
+    """
+
+    def __init__(self, db_path, seed_fn=None):
+        self.db_path = db_path
+        self._seed_fn = seed_fn
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.generation = 1
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._create_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self, conn):
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS users (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                email TEXT NOT NULL,
+                password TEXT NOT NULL,
+                role TEXT NOT NULL DEFAULT 'user',
+                created_at TEXT,
+                last_login TEXT
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users(email);
+            CREATE INDEX IF NOT EXISTS idx_users_email_lower ON users(lower(email));
+            CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at);
+            CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+        """)
+
+    def import_users(self, users):
+        conn = self._conn()
+        with self._lock, conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO users ({', '.join(USER_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in USER_COLUMNS)})",
+                [tuple(u.get(c) for c in USER_COLUMNS) for u in users]
+            )
+        return self.count()
+
+    def import_json(self, path):
+        with open(path, 'r') as f:
+            return self.import_users(json.load(f))
+
+    def load(self):
+        # An empty database is seeded from users.json (or its defaults).
+        if self._seed_fn and self.count() == 0:
+            self.import_users(self._seed_fn())
+        return self.count()
+
+    def flush(self):
+        return True
+
+    def all(self):
+        rows = self._conn().execute('SELECT * FROM users ORDER BY created_at').fetchall()
+        return [dict(r) for r in rows]
+
+    def count(self):
+        return self._conn().execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def find_by_email(self, email):
+        row = self._conn().execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_id(self, user_id):
+        row = self._conn().execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+        return dict(row) if row else None
+
+    def add(self, user):
+        conn = self._conn()
+        try:
+            with self._lock, conn:
+                conn.execute(
+                    f"INSERT INTO users ({', '.join(USER_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in USER_COLUMNS)})",
+                    tuple(user.get(c) for c in USER_COLUMNS)
+                )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def update(self, user_id, **fields):
+        fields = {k: v for k, v in fields.items() if k in USER_COLUMNS and k != 'id'}
+        if fields:
+            conn = self._conn()
+            with self._lock, conn:
+                conn.execute(
+                    f"UPDATE users SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+                    (*fields.values(), user_id)
+                )
+        return self.find_by_id(user_id)
+
+    def iter_users(self, query):
+        clauses, params = [], []
+        if query.role:
+            clauses.append('role = ?')
+            params.append(query.role)
+        if query.email_prefix:
+            clauses.append('lower(email) >= ? AND lower(email) < ?')
+            params.extend([query.email_prefix, query.email_prefix + '\uffff'])
+        if query.created_after:
+            clauses.append('created_at >= ?')
+            params.append(query.created_after)
+        if query.created_before:
+            clauses.append('created_at < ?')
+            params.append(query.created_before)
+        column = query.sort
+        if query.after:
+            clauses.append(f"({column}, id) {'<' if query.descending else '>'} (?, ?)")
+            params.extend(query.after)
+        direction = 'DESC' if query.descending else 'ASC'
+        sql = 'SELECT * FROM users'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += f" ORDER BY {column} {direction}, id {direction}"
+        # Rows are pulled from the cursor one at a time, never as a list.
+        for row in self._conn().execute(sql, params):
+            yield dict(row)
+
+
+def create_user_store(backend, users_file, db_path, load_fn, **options):
+    if backend == 'sqlite':
+        return SqliteUserStore(db_path, seed_fn=load_fn)
+    return UserRepository(users_file, load_fn, **options)
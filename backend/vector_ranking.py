@@ -0,0 +1,345 @@
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from lexicon import COLOR_BITS
+from ranking import ScoredProduct, TOP_K
+from search_index import TOKEN_RE
+from snapshot import Snapshot
+
+
+class _Columns(Snapshot):
+    __slots__ = ('products', 'rows', 'ratings', 'prices', 'category_codes', 'categories',
+                 'color_bits', 'features', 'postings', 'keyword_hits')
+
+
+class ColumnarCatalog:
+    """NumPy column view of the catalog with a vectorized chat scorer.
+
+    Scores with exactly the rules of ranking.rank_products, so the two are
+    interchangeable; this one only pays off on large catalogs.
+    """
+
+    def __init__(self, features_fn, keyword_cache_size=256):
+        if np is None:
+            raise RuntimeError("numpy is required for vectorized scoring")
+        self.features_fn = features_fn
+        self.keyword_cache_size = keyword_cache_size
+        self._cols = None
+
+    def __len__(self):
+        return len(self._cols.products) if self._cols else 0
+
+    def build(self, products):
+        products = list(products)
+        categories = sorted({p.get('category') for p in products if p.get('category')})
+        category_index = {c: i for i, c in enumerate(categories)}
+        features = [self.features_fn(p) for p in products]
+
+        self._cols = _Columns(
+            products=products,
+            rows={p['id']: i for i, p in enumerate(products)},
+            ratings=np.array([_rating(p) for p in products], dtype=np.float64),
+            prices=np.array([_price(p) for p in products], dtype=np.float64),
+            category_codes=np.array([category_index.get(p.get('category'), -1) for p in products], dtype=np.int32),
+            categories=category_index,
+            color_bits=np.array([_color_bits(f) for f in features], dtype=np.uint16),
+            features=features,
+            postings=_postings(features),
+            keyword_hits=OrderedDict()
+        )
+
+    def apply(self, changed=(), removed=()):
+        """Patch the rows of a few edited or removed products in place of a rebuild."""
+        old = self._cols
+        if old is None:
+            return
+        changed = list(changed)
+        categories = dict(old.categories)
+        for product in changed:
+            if product.get('category') and product['category'] not in categories:
+                categories[product['category']] = len(categories)
+
+        products = list(old.products)
+        features = list(old.features)
+        ratings, prices = old.ratings.copy(), old.prices.copy()
+        category_codes, color_bits = old.category_codes.copy(), old.color_bits.copy()
+        postings = dict(old.postings)
+        appended = []
+        for product in changed:
+            product_features = self.features_fn(product)
+            row = old.rows.get(product['id'])
+            values = (_rating(product), _price(product), categories.get(product.get('category'), -1),
+                      _color_bits(product_features))
+            if row is None:
+                row = len(products) + len(appended)
+                appended.append((product, values))
+                _post(postings, row, frozenset(), product_features.tokens)
+                features.append(product_features)
+                continue
+            _post(postings, row, features[row].tokens, product_features.tokens)
+            products[row] = product
+            features[row] = product_features
+            ratings[row], prices[row], category_codes[row], color_bits[row] = values
+
+        if appended:
+            products.extend(product for product, _ in appended)
+            columns = list(zip(*(values for _, values in appended)))
+            ratings = np.concatenate([ratings, np.array(columns[0], dtype=np.float64)])
+            prices = np.concatenate([prices, np.array(columns[1], dtype=np.float64)])
+            category_codes = np.concatenate([category_codes, np.array(columns[2], dtype=np.int32)])
+            color_bits = np.concatenate([color_bits, np.array(columns[3], dtype=np.uint16)])
+
+        drop = [old.rows[pid] for pid in removed if pid in old.rows]
+        if drop:
+            keep = np.ones(len(products), dtype=bool)
+            keep[drop] = False
+            products = [p for p, kept in zip(products, keep) if kept]
+            features = [f for f, kept in zip(features, keep) if kept]
+            ratings, prices = ratings[keep], prices[keep]
+            category_codes, color_bits = category_codes[keep], color_bits[keep]
+            # Rows after a dropped one move up; renumber every posting.
+            new_row = np.cumsum(keep, dtype=np.int32) - 1
+            postings = {token: new_row[rows[keep[rows]]] for token, rows in postings.items()}
+            postings = {token: rows for token, rows in postings.items() if len(rows)}
+
+        self._cols = _Columns(
+            products=products,
+            rows={p['id']: i for i, p in enumerate(products)},
+            ratings=ratings,
+            prices=prices,
+            category_codes=category_codes,
+            categories=categories,
+            color_bits=color_bits,
+            features=features,
+            postings=postings,
+            keyword_hits=OrderedDict()
+        )
+
+    def _keyword_hits(self, cols, keyword):
+        hits = cols.keyword_hits.get(keyword)
+        if hits is None:
+            hits = np.zeros(len(cols.products), dtype=bool)
+            if TOKEN_RE.fullmatch(keyword):
+                # An all-alphanumeric substring of the text always sits
+                # inside one token, so checking the vocabulary is exact.
+                for token, rows in cols.postings.items():
+                    if keyword in token:
+                        hits[rows] = True
+            else:
+                for row, features in enumerate(cols.features):
+                    hits[row] = keyword in features.title or keyword in features.description
+            cols.keyword_hits[keyword] = hits
+            if len(cols.keyword_hits) > self.keyword_cache_size:
+                cols.keyword_hits.popitem(last=False)
+        else:
+            cols.keyword_hits.move_to_end(keyword)
+        return hits
+
+    def rank(self, keywords, user_color=None, min_rating=None, category=None, k=TOP_K):
+        cols = self._cols
+        n = len(cols.products)
+        keywords = [keyword.lower() for keyword in keywords if keyword and len(keyword) > 2]
+        match_all = not keywords and not user_color
+
+        mask = np.ones(n, dtype=bool)
+        if category is not None:
+            mask &= cols.category_codes == cols.categories.get(category, -2)
+        if min_rating:
+            mask &= cols.ratings >= min_rating
+
+        present_bits = int(np.bitwise_or.reduce(cols.color_bits[mask])) if mask.any() else 0
+        available_colors = sorted(c for c, bit in COLOR_BITS.items() if present_bits & bit)
+
+        if user_color in COLOR_BITS:
+            color_hit = (cols.color_bits & COLOR_BITS[user_color]) != 0
+        else:
+            color_hit = np.zeros(n, dtype=bool)
+
+        scores = np.zeros(n, dtype=np.int16)
+        if keywords:
+            keyword_hit = np.zeros(n, dtype=bool)
+            for keyword in keywords:
+                keyword_hit |= self._keyword_hits(cols, keyword)
+            scores += 3 * keyword_hit
+        if user_color:
+            scores += np.where(color_hit, 5, -2).astype(np.int16)
+        scores += cols.ratings >= 4.5
+
+        exact = mask & color_hit
+        exact_found = bool(exact.any())
+        if exact_found:
+            candidates = exact
+        elif match_all:
+            candidates = mask & ~color_hit
+        else:
+            candidates = mask & ~color_hit & (scores > 0)
+
+        top = self._top_k(np.flatnonzero(candidates), scores, k)
+        color = user_color if exact_found else None
+        results = [ScoredProduct(cols.products[i], int(scores[i]), color, int(i)) for i in top]
+
+        metadata = {
+            'exact_color_found': exact_found,
+            'available_colors': available_colors,
+            'color_detected_in_any': exact_found
+        }
+        return results, metadata
+
+    @staticmethod
+    def _top_k(idx, scores, k):
+        if len(idx) == 0:
+            return idx
+        candidate_scores = scores[idx]
+        if len(idx) > k:
+            # Everything above the k-th best score is in; ties at the
+            # boundary go to the earliest products, as a stable sort would.
+            kth = np.partition(candidate_scores, len(idx) - k)[len(idx) - k]
+            above = idx[candidate_scores > kth]
+            tied = idx[candidate_scores == kth][:k - len(above)]
+            idx = np.concatenate([above, tied])
+            candidate_scores = scores[idx]
+        order = np.lexsort((idx, -candidate_scores.astype(np.int32)))
+        return idx[order]
+
+
+def _rating(product):
+    return product.get('rating', {}).get('rate', 0)
+
+
+def _price(product):
+    return float(product.get('price') or 0)
+
+
+def _color_bits(features):
+    return sum(COLOR_BITS[c] for c in features.colors if c in COLOR_BITS)
+
+
+def _postings(features):
+    rows = {}
+    for row, product_features in enumerate(features):
+        for token in product_features.tokens:
+            rows.setdefault(token, []).append(row)
+    return {token: np.array(token_rows, dtype=np.int32) for token, token_rows in rows.items()}
+
+
+def _post(postings, row, old_tokens, new_tokens):
+    # Copy-on-write: arrays are replaced, never modified, so readers of
+    # the previous columns are unaffected.
+    for token in old_tokens - new_tokens:
+        rows = postings[token][postings[token] != row]
+        if len(rows):
+            postings[token] = rows
+        else:
+            del postings[token]
+    for token in new_tokens - old_tokens:
+        postings[token] = np.append(postings.get(token, np.empty(0, dtype=np.int32)), np.int32(row))
+
+
+def _synthetic_catalog(n, seed=7):
+    import random
+    from lexicon import COLOR_SYNONYMS
+
+    rng = random.Random(seed)
+    categories = ['electronics', 'jewelery', "men's clothing", "women's clothing"]
+    nouns = ['shirt', 'jacket', 'dress', 'ring', 'necklace', 'laptop', 'monitor', 'drive',
+             'backpack', 'bracelet', 'coat', 'hoodie', 'skirt', 'phone', 'charger']
+    fillers = ['premium', 'casual', 'slim', 'cotton', 'gaming', 'portable', 'classic', 'soft']
+    color_words = [w for words in COLOR_SYNONYMS.values() for w in words]
+    products = []
+    for i in range(n):
+        title_words = rng.sample(fillers, 2) + [rng.choice(nouns)]
+        if rng.random() < 0.4:
+            title_words.insert(0, rng.choice(color_words))
+        description = ' '.join(rng.choice(fillers + nouns + color_words[:10]) for _ in range(12))
+        products.append({
+            'id': i + 1,
+            'title': ' '.join(title_words).title(),
+            'price': round(rng.uniform(5, 900), 2),
+            'category': rng.choice(categories),
+            'description': description,
+            'image': '',
+            'rating': {'rate': round(rng.uniform(1, 5), 1), 'count': rng.randint(0, 500)}
+        })
+    return products
+
+
+if __name__ == '__main__':
+    import time
+    import random
+    from catalog import ProductFeatures
+    from search_index import tokenize
+    from lexicon import LEXICON
+    from ranking import rank_products
+
+    def annotate(product):
+        title = product['title'].lower()
+        description = product.get('description', '').lower()
+        text = f"{title} {description}"
+        return ProductFeatures(title, description, frozenset(tokenize(text)), frozenset(LEXICON.colors_in(text)))
+
+    def intents(rng, count):
+        keyword_pool = ['shirt', 'jacket', 'gold', 'cotton', 'gaming', 'ring', 'xyz', 'dress', 'red', 'navy']
+        for _ in range(count):
+            yield (
+                rng.sample(keyword_pool, rng.randint(0, 3)),
+                rng.choice([None, None, 'red', 'blue', 'black', 'gold', 'silver']),
+                rng.choice([None, None, 3, 4, 4.5]),
+                rng.choice([None, 'electronics', 'jewelery', "men's clothing", "women's clothing"])
+            )
+
+    def python_rank(products, by_category, features, keywords, color, min_rating, category):
+        source = by_category.get(category, []) if category else products
+        return rank_products(source, lambda p: features[p['id']], keywords, color, min_rating)
+
+    def key(result):
+        results, metadata = result
+        return [(r.product['id'], r.score, r.color) for r in results], metadata
+
+    rng = random.Random(1)
+    for size in (1000, 10000, 100000):
+        products = _synthetic_catalog(size)
+        features = {p['id']: annotate(p) for p in products}
+        by_category = {}
+        for p in products:
+            by_category.setdefault(p['category'], []).append(p)
+        columnar = ColumnarCatalog(lambda p: features[p['id']])
+        columnar.build(products)
+
+        queries = list(intents(rng, 50))
+        mismatches = 0
+        for keywords, color, min_rating, category in queries:
+            expected = key(python_rank(products, by_category, features, keywords, color, min_rating, category))
+            actual = key(columnar.rank(keywords, color, min_rating, category))
+            mismatches += expected != actual
+        print(f"{size:>7} products: parity {len(queries) - mismatches}/{len(queries)}")
+
+        started = time.perf_counter()
+        for keywords, color, min_rating, category in queries:
+            python_rank(products, by_category, features, keywords, color, min_rating, category)
+        python_ms = (time.perf_counter() - started) / len(queries) * 1000
+
+        started = time.perf_counter()
+        for keywords, color, min_rating, category in queries:
+            columnar.rank(keywords, color, min_rating, category)
+        vector_ms = (time.perf_counter() - started) / len(queries) * 1000
+        print(f"{'':>17} python {python_ms:8.2f} ms/query   numpy {vector_ms:8.2f} ms/query")
+
+    # Patching rows must leave the columns exactly as a rebuild would.
+    products = _synthetic_catalog(1000)
+    edits = [dict(p, title='Crimson ' + p['title'], category='gadgets') for p in products[:5]]
+    added = _synthetic_catalog(1005)[1000:]
+    removed = [p['id'] for p in products[10:15]]
+    edited = {p['id']: p for p in edits}
+    expected = [edited.get(p['id'], p) for p in products if p['id'] not in removed] + added
+    patched = ColumnarCatalog(lambda p: annotate(p))
+    patched.build(products)
+    patched.apply(edits + added, removed)
+    rebuilt = ColumnarCatalog(lambda p: annotate(p))
+    rebuilt.build(expected)
+    queries = list(intents(rng, 50)) + [(['crimson'], 'red', None, 'gadgets')]
+    same = sum(key(patched.rank(*q)) == key(rebuilt.rank(*q)) for q in queries)
+    print(f"incremental apply: parity {same}/{len(queries)}")
@@ -233,18 +233,29 @@ export default function AuthProvider({ children }) {
     }
 
     try {
-      const response = await fetch(`${API_BASE_URL}/admin/users`, {
-        method: "GET",
-        headers: getAuthHeader(),
-      });
+      // The listing is paginated; follow next_cursor until the last page.
+      const users = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ limit: "500" });
+        if (cursor) params.set("cursor", cursor);
+
+        const response = await fetch(`${API_BASE_URL}/admin/users?${params}`, {
+          method: "GET",
+          headers: getAuthHeader(),
+        });
 
-      const data = await response.json();
+        const data = await response.json();
 
-      if (!response.ok) {
-        throw new Error(data.error || "Failed to fetch users");
-      }
+        if (!response.ok) {
+          throw new Error(data.error || "Failed to fetch users");
+        }
+
+        users.push(...data.users);
+        cursor = data.next_cursor;
+      } while (cursor);
 
-      return data.users;
+      return users;
     } catch (error) {
       throw error;
     }
@@ -13,6 +13,7 @@ const Chatbot = () => {
     const [isTyping, setIsTyping] = useState(false);
     const messagesEndRef = useRef(null);
     const BACKEND_URL = "http://localhost:5000/chat";
+    const STREAM_URL = `${BACKEND_URL}/stream`;
 
     const scrollToBottom = () => {
         messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -40,40 +41,73 @@ const Chatbot = () => {
         setIsTyping(true);
         
         try {
-            const response = await fetch(BACKEND_URL, {
+            const response = await fetch(STREAM_URL, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ message: inputValue })
             });
             
             console.log('📡 Response status:', response.status);
-            const data = await response.json();
-            console.log('📦 Response data:', data);
-            
-            if (data.success) {
-                const botMessage = { 
-                    id: Date.now() + 1, 
-                    text: data.reply, 
-                    isUser: false,
-                    metadata: data.metadata || {},
-                    filters: data.filters || {}
-                };
-                setMessages(prev => [...prev, botMessage]);
-                
-                if (data.products && data.products.length > 0) {
-                    const productMessage = {
-                        id: Date.now() + 2,
-                        text: `Found ${data.products.length} matching product(s)`,
+            if (!response.ok || !response.body) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+
+            const botId = Date.now() + 1;
+            const productsId = Date.now() + 2;
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            // The backend sends newline-delimited JSON events:
+            // start -> reply -> product (one per product) -> done.
+            const handleEvent = (event) => {
+                if (event.type === 'reply') {
+                    setIsTyping(false);
+                    setMessages(prev => [...prev, {
+                        id: botId,
+                        text: event.reply,
                         isUser: false,
-                        products: data.products,
-                        showProducts: true,
-                        filters: data.filters || {},
-                        metadata: data.metadata || {}
-                    };
-                    setMessages(prev => [...prev, productMessage]);
+                        metadata: {},
+                        filters: {}
+                    }]);
+                } else if (event.type === 'product') {
+                    setMessages(prev => {
+                        const existing = prev.find(m => m.id === productsId);
+                        if (!existing) {
+                            return [...prev, {
+                                id: productsId,
+                                text: 'Found 1 matching product(s)',
+                                isUser: false,
+                                products: [event.product],
+                                showProducts: true,
+                                filters: {},
+                                metadata: {}
+                            }];
+                        }
+                        const products = [...existing.products, event.product];
+                        return prev.map(m => m.id === productsId
+                            ? { ...m, products, text: `Found ${products.length} matching product(s)` }
+                            : m);
+                    });
+                } else if (event.type === 'done') {
+                    setMessages(prev => prev.map(m => (m.id === botId || m.id === productsId)
+                        ? { ...m, filters: event.filters || {}, metadata: event.metadata || {} }
+                        : m));
+                } else if (event.type === 'error') {
+                    throw new Error(event.reply || 'Request failed');
                 }
-            } else {
-                throw new Error(data.error || 'Request failed');
+            };
+
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+            }
+            if (buffer.trim()) {
+                handleEvent(JSON.parse(buffer));
             }
             
         } catch (error) {
@@ -1,18 +1,22 @@
-import React, { createContext, useContext, useState, useEffect, useCallback } from 'react';
-import { getProducts, refreshProductsCache } from '../service/api';
+import React, { createContext, useContext, useState, useEffect, useCallback, useRef } from 'react';
+import { getProductsWithVersion, getProductChanges, refreshProductsCache } from '../service/api';
 
 const ProductsContext = createContext();
 export function ProductsProvider({ children }) {
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [initialized, setInitialized] = useState(false);
+  const versionRef = useRef(null);
+  const epochRef = useRef(null);
   const fetchProducts = useCallback(async (force = false) => {
     if (!force && initialized) return;
     
     setLoading(true);
     try {
-      const data = await getProducts(force);
+      const { products: data, version, epoch } = await getProductsWithVersion(force);
       setProducts(data || []);
+      versionRef.current = version;
+      epochRef.current = epoch;
       setInitialized(true);
     } catch (error) {
       console.error('Failed to fetch products:', error);
@@ -21,6 +25,39 @@ export function ProductsProvider({ children }) {
     }
   }, [initialized]);
 
+  // Pull only what changed since the last load; fall back to a full
+  // reload when we never got a version (e.g. served from the offline copy)
+  // or the server restarted since, which resets versions and local edits.
+  const syncProducts = useCallback(async () => {
+    if (versionRef.current === null || !epochRef.current) {
+      await fetchProducts(true);
+      return;
+    }
+    try {
+      const { version, reset, products: changed, removed } = await getProductChanges(
+        versionRef.current,
+        epochRef.current
+      );
+      if (reset) {
+        await fetchProducts(true);
+        return;
+      }
+      const changedById = new Map(changed.map((p) => [p.id, p]));
+      const removedIds = new Set(removed);
+      setProducts((prev) => {
+        const next = prev
+          .filter((p) => !removedIds.has(p.id))
+          .map((p) => changedById.get(p.id) || p);
+        const known = new Set(next.map((p) => p.id));
+        return next.concat(changed.filter((p) => !known.has(p.id)));
+      });
+      versionRef.current = version;
+    } catch (error) {
+      console.error('Failed to sync products:', error);
+      await fetchProducts(true);
+    }
+  }, [fetchProducts]);
+
   const refreshProducts = useCallback(async () => {
     await refreshProductsCache();
     await fetchProducts(true);
@@ -34,6 +71,7 @@ export function ProductsProvider({ children }) {
     products,
     loading,
     refreshProducts,
+    syncProducts,
     initialized
   };
   
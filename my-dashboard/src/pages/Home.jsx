@@ -3,6 +3,7 @@ import { useNavigate } from "react-router-dom";
 import { useAuth } from "../components/AuthProvider"; 
 import "./Home.css";
 import { useShop } from "../context/ShopContext";
+import { getCategories, getProductsWithVersion } from "../service/api";
 
 export default function Home() {
   const navigate = useNavigate();
@@ -38,13 +39,13 @@ export default function Home() {
 
     console.log("Home page accessed by:", user?.name, "Role:", user?.role);
 
-    fetch("https://fakestoreapi.com/products/categories")
-      .then((res) => res.json())
-      .then((data) => setCategories(data));
+    getCategories()
+      .then((data) => setCategories(data))
+      .catch(() => setCategories([]));
 
-    fetch("https://fakestoreapi.com/products?limit=4")
-      .then((res) => res.json())
-      .then((data) => setFeaturedProducts(data));
+    getProductsWithVersion(false, "?limit=4")
+      .then(({ products }) => setFeaturedProducts(products.slice(0, 4)))
+      .catch(() => setFeaturedProducts([]));
   }, [isAuthenticated, navigate, user]);
 
 
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { useShop } from "../context/ShopContext";
+import { getProductById } from "../service/api";
 
 export default function ProductDetails() {
   const { id } = useParams();
@@ -8,11 +9,14 @@ export default function ProductDetails() {
   const { addToCart, toggleWishlist, wishlist } = useShop();
   const [product, setProduct] = useState(null);
   const [quantity, setQuantity] = useState(1);
+  const [notFound, setNotFound] = useState(false);
 
   useEffect(() => {
-    fetch(`https://fakestoreapi.com/products/${id}`)
-      .then(res => res.json())
-      .then(data => setProduct(data));
+    // Served by the backend so admin-created and edited products resolve too.
+    setNotFound(false);
+    getProductById(id)
+      .then(data => (data && data.id !== undefined ? setProduct(data) : setNotFound(true)))
+      .catch(() => setNotFound(true));
   }, [id]);
 
   if (!product) {
@@ -25,7 +29,7 @@ export default function ProductDetails() {
         fontSize: '18px',
         color: '#666'
       }}>
-        Loading product details...
+        {notFound ? 'Product not found.' : 'Loading product details...'}
       </div>
     );
   }
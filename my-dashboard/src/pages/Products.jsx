@@ -1,15 +1,10 @@
-import React, { useEffect, useState } from "react";
+import React from "react";
 import { useShop } from "../context/ShopContext";
+import { useProducts } from "../context/ProductsContext";
 
 export default function Products() {
   const { searchTerm, addToWishlist, addToCart } = useShop();
-  const [products, setProducts] = useState([]);
-
-  useEffect(() => {
-    fetch("https://fakestoreapi.com/products")
-      .then((res) => res.json())
-      .then((data) => setProducts(data));
-  }, []);
+  const { products } = useProducts();
 
   const filtered = products.filter((p) =>
     p.title.toLowerCase().includes(searchTerm.toLowerCase())
@@ -20,7 +20,7 @@ export default function Reports() {
   const categoryParam = params?.category;
   const categorySlug = categoryParam || searchParams.get("category") || "all";
 
-  const { products, loading, refreshProducts } = useProducts();
+  const { products, loading, refreshProducts, syncProducts } = useProducts();
   
   const [visibleProducts, setVisibleProducts] = useState([]);
   const [editing, setEditing] = useState(null);
@@ -81,14 +81,14 @@ export default function Reports() {
     if (editing && editing.id) {
       try {
         await apiUpdate(editing.id, payload);
-        refreshProducts(); 
+        syncProducts(); 
       } catch (err) {
         console.error(err);
       }
     } else if (editing) {
       try {
         await apiCreate(payload);
-        refreshProducts(); 
+        syncProducts(); 
       } catch (err) {
         console.error(err);
       }
@@ -109,7 +109,7 @@ export default function Reports() {
     setTimeout(async () => {
       try {
         await apiDelete(id);
-        refreshProducts(); 
+        syncProducts(); 
       } catch (err) {
         console.error(err);
       }
@@ -1,17 +1,11 @@
-const API = 'https://fakestoreapi.com/products';
+const API_BASE_URL = 'http://localhost:5000/api';
+const API = `${API_BASE_URL}/products`;
+const ADMIN_API = `${API_BASE_URL}/admin/products`;
 const CACHE_KEY = 'products_cache';
-const CACHE_TIMESTAMP_KEY = 'products_cache_timestamp';
-const CACHE_DURATION = 30 * 60 * 1000;
-
-const isCacheValid = () => {
-  const timestamp = localStorage.getItem(CACHE_TIMESTAMP_KEY);
-  if (!timestamp) return false;
-  
-  const now = Date.now();
-  const cacheAge = now - parseInt(timestamp, 10);
-  return cacheAge < CACHE_DURATION;
-};
 
+// The backend serves the catalog with strong ETags, so the browser HTTP
+// cache revalidates with a cheap 304 instead of re-downloading. The
+// localStorage copy is only a fallback for when the backend is down.
 const getFromCache = () => {
   try {
     const cached = localStorage.getItem(CACHE_KEY);
@@ -24,40 +18,40 @@ const getFromCache = () => {
 const saveToCache = (data) => {
   try {
     localStorage.setItem(CACHE_KEY, JSON.stringify(data));
-    localStorage.setItem(CACHE_TIMESTAMP_KEY, Date.now().toString());
   } catch (error) {
   }
 };
 
 const clearCache = () => {
   localStorage.removeItem(CACHE_KEY);
-  localStorage.removeItem(CACHE_TIMESTAMP_KEY);
 };
 
-export const getProducts = async (forceRefresh = false) => {
-  if (!forceRefresh && isCacheValid()) {
-    const cachedData = getFromCache();
-    if (cachedData) {
-      return cachedData;
-    }
-  }
+export const getProducts = async (forceRefresh = false, fields = null) => {
+  const query = fields ? `?fields=${fields.join(',')}` : '';
+  return (await getProductsWithVersion(forceRefresh, query)).products;
+};
 
+export const getProductsWithVersion = async (forceRefresh = false, query = '') => {
   try {
-    const response = await fetch(API);
+    const response = await fetch(`${API}${query}`, {
+      cache: forceRefresh ? 'reload' : 'no-cache',
+    });
     
     if (!response.ok) {
       throw new Error(`HTTP ${response.status}: ${response.statusText}`);
     }
     
     const data = await response.json();
+    const version = parseInt(response.headers.get('X-Catalog-Version'), 10) || null;
+    const epoch = response.headers.get('X-Catalog-Epoch');
     
-    saveToCache(data);
+    if (!query) saveToCache(data);
     
-    return data;
+    return { products: data, version, epoch };
   } catch (error) {
     const cachedData = getFromCache();
     if (cachedData) {
-      return cachedData;
+      return { products: cachedData, version: null, epoch: null };
     }
     
     throw error;
@@ -70,38 +64,49 @@ export const refreshProductsCache = async () => {
 };
 
 export const getProductById = async (id) => {
-  const res = await fetch(`${API}/${id}`);
+  const res = await fetch(`${API}/${id}`, { cache: 'no-cache' });
   return res.json();
 };
 
-export const createProduct = async (data) => {
-  const res = await fetch(API, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(data),
-  });
-  
-  clearCache();
-  
+export const getCategories = async () => {
+  const res = await fetch(`${API}/categories`, { cache: 'no-cache' });
   return res.json();
 };
 
-export const updateProduct = async (id, data) => {
-  const res = await fetch(`${API}/${id}`, {
-    method: 'PUT',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(data),
-  });
-  
-  clearCache();
-  
+export const getProductChanges = async (since, epoch) => {
+  const res = await fetch(`${API}/changes?since=${since}&epoch=${encodeURIComponent(epoch)}`);
+  if (!res.ok) {
+    throw new Error(`HTTP ${res.status}: ${res.statusText}`);
+  }
   return res.json();
 };
 
+const adminRequest = async (path, method, data) => {
+  const res = await fetch(`${ADMIN_API}${path}`, {
+    method,
+    headers: {
+      'Content-Type': 'application/json',
+      Authorization: `Bearer ${localStorage.getItem('jwt_token')}`,
+    },
+    body: data === undefined ? undefined : JSON.stringify(data),
+  });
+  const body = await res.json();
+  if (!res.ok || !body.success) {
+    throw new Error(body.error || `HTTP ${res.status}`);
+  }
+  return body;
+};
+
+export const createProduct = async (data) => {
+  const { product } = await adminRequest('', 'POST', data);
+  return product;
+};
+
+export const updateProduct = async (id, data) => {
+  const { product } = await adminRequest(`/${id}`, 'PUT', data);
+  return product;
+};
+
 export const deleteProduct = async (id) => {
-  const res = await fetch(`${API}/${id}`, { method: 'DELETE' });
-  
-  clearCache();
-  
-  return res.json();
-};
\ No newline at end of file
+  return adminRequest(`/${id}`, 'DELETE');
+};